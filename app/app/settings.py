@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
@@ -46,6 +47,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,16 +83,130 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# With DB_POOL=1 every worker process checks connections out of its own
+# pool (core/db/pool.py) and returns them at the end of each request, so
+# CONN_MAX_AGE is left at 0. Otherwise connections persist per thread for
+# DB_CONN_MAX_AGE seconds.
+DB_POOL = os.environ.get('DB_POOL', '0') == '1'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.db.backends.postgresql_pool' if DB_POOL
+            else 'django.db.backends.postgresql'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60))
+        ),
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 0)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'CHECK': os.environ.get('DB_POOL_CHECK', '1') == '1',
+        },
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The response cache relies on shared generation counters, so it is only on
+# by default when CACHE_BACKEND/CACHE_LOCATION name a shared backend such as
+# the database cache. A LocMemCache would keep every process's invalidations
+# to itself, and is rejected by the recipe.E001 check.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+RESPONSE_CACHE = {
+    'ENABLED': os.environ.get(
+        'RESPONSE_CACHE_ENABLED',
+        '0' if CACHES['default']['BACKEND'].endswith('.LocMemCache') else '1',
+    ) == '1',
+    'CACHE': 'default',
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300)),
+}
+
+# Responses of at least MIN_SIZE bytes are compressed with brotli, when the
+# Brotli package is installed, or gzip, whichever the client prefers. Exports
+# are compressed as they stream. Cached list pages keep their compressed
+# bytes next to the payload so repeated hits are not compressed again.
+RESPONSE_COMPRESSION = {
+    'ENABLED': os.environ.get('RESPONSE_COMPRESSION_ENABLED', '1') == '1',
+    'MIN_SIZE': int(os.environ.get('RESPONSE_COMPRESSION_MIN_SIZE', 1024)),
+}
+
+# List pages of recipes, tags and ingredients are built from database rows
+# into plain dicts instead of model instances and serializer fields. The
+# output is the same, disable to compare.
+RECIPE_FAST_LIST = {
+    'ENABLED': os.environ.get('RECIPE_FAST_LIST_ENABLED', '1') == '1',
+}
+
+# Resized copies of uploaded recipe images, longest side in pixels. They are
+# rendered as JPEG and WebP by the run_worker job queue after the upload.
+RECIPE_IMAGE_VARIANTS = {
+    'SIZES': {
+        'thumbnail': 160,
+        'small': 480,
+        'medium': 960,
+    },
+    'ASYNC': os.environ.get('IMAGE_VARIANTS_ASYNC', '1') == '1',
+}
+
+# /health/ready caches its database and migration checks for CACHE_TTL
+# seconds so frequent probes do not load the database.
+HEALTH_CHECKS = {
+    'CACHE_TTL': float(os.environ.get('HEALTH_CACHE_TTL', 5)),
+}
+
+# Request metrics served at /metrics, see core/metrics.py. Each worker
+# process writes its counters to METRICS_DIR every FLUSH_INTERVAL seconds so
+# that any worker can report the totals of all of them; without a directory
+# only the answering process is reported. Scrapers send METRICS_TOKEN in an
+# "Authorization: Bearer <token>" header and staff may look from an admin
+# session; anyone else is refused unless METRICS_ALLOW_ANONYMOUS=1.
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', '1') == '1',
+    'DIR': os.environ.get('METRICS_DIR') or None,
+    'FLUSH_INTERVAL': float(os.environ.get('METRICS_FLUSH_INTERVAL', 5)),
+    'TOKEN': os.environ.get('METRICS_TOKEN') or None,
+    'ALLOW_ANONYMOUS': os.environ.get('METRICS_ALLOW_ANONYMOUS', '0') == '1',
+}
+
+# Requests sending the X-Server-Timing header get a Server-Timing response
+# header with auth, db, serialize and render durations when the user is
+# staff or the header contains SERVER_TIMING_TOKEN. Adding "sql" to the
+# header (e.g. "X-Server-Timing: 1,sql") also lists every SQL statement.
+SERVER_TIMING = {
+    'ENABLED': os.environ.get('SERVER_TIMING_ENABLED', '1') == '1',
+    'HEADER': 'X-Server-Timing',
+    'TOKEN': os.environ.get('SERVER_TIMING_TOKEN') or None,
+}
+
+# Background jobs, see core/jobs.py and the run_worker command. Failed jobs
+# are retried after BACKOFF * 2 ** (attempt - 1) seconds, capped at
+# MAX_BACKOFF. Jobs locked for longer than LOCK_TIMEOUT seconds are assumed
+# to belong to a dead worker and are run again.
+JOBS = {
+    'MAX_ATTEMPTS': int(os.environ.get('JOBS_MAX_ATTEMPTS', 5)),
+    'BACKOFF': int(os.environ.get('JOBS_BACKOFF', 5)),
+    'MAX_BACKOFF': int(os.environ.get('JOBS_MAX_BACKOFF', 600)),
+    'LOCK_TIMEOUT': int(os.environ.get('JOBS_LOCK_TIMEOUT', 900)),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -143,6 +261,20 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Cached token authentication, see core/authentication.py
+# Entries in the in-process tier may be served for up to TTL seconds after a
+# change made by another worker; the shared tier is invalidated directly.
+# Invalidation runs on the user's post_save signal, so a change made with
+# QuerySet.update(), e.g. deactivating users in bulk, only applies once the
+# entries expire: after TTL seconds, or SHARED_TTL with a shared cache.
+
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_CACHE_MAX_SIZE', 1024)),
+    'TTL': int(os.environ.get('TOKEN_CACHE_TTL', 30)),
+    'SHARED_CACHE': os.environ.get('TOKEN_CACHE_SHARED'),
+    'SHARED_TTL': int(os.environ.get('TOKEN_CACHE_SHARED_TTL', 60)),
+}
+
 SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
 }
@@ -22,6 +22,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
+from core import views as core_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -33,8 +34,14 @@ urlpatterns = [
          SpectacularRedocView.as_view(url_name='api-schema'),
          name='redoc'),
 
+    path('health/live', core_views.health_live, name='health-live'),
+    path('health/ready', core_views.health_ready, name='health-ready'),
+    path('metrics', core_views.metrics_view, name='metrics'),
+
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('api/async/recipe/', include('recipe.async_urls')),
+    path('api/core/', include('core.urls')),
 ]
 
 if settings.DEBUG:
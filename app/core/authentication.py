@@ -0,0 +1,204 @@
+"""
+Token authentication backed by an in-process and shared cache
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from core import timing
+
+
+DEFAULTS = {
+    'MAX_SIZE': 1024,
+    'TTL': 30,
+    'SHARED_CACHE': None,
+    'SHARED_TTL': 60,
+}
+
+# Never cached, read from the database if a request needs them
+UNCACHED_USER_FIELDS = ('password',)
+
+
+def get_config():
+    """Return the token cache settings merged with the defaults"""
+    return {**DEFAULTS, **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+
+
+def user_to_entry(user):
+    """Return the cacheable column values of the user"""
+    return {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+        if field.attname not in UNCACHED_USER_FIELDS
+    }
+
+
+def entry_to_user(entry):
+    """Return a new user instance built from cached column values"""
+    model = get_user_model()
+    names = [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in entry
+    ]
+    return model.from_db(
+        router.db_for_read(model), names, [entry[name] for name in names])
+
+
+class TokenCache:
+    """Bounded LRU of authenticated users keyed by token
+
+    Both tiers hold plain column values rather than user instances, so every
+    hit gets its own instance and the password hash is never cached.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared(self, config):
+        """Return the shared cache, if one is configured"""
+        alias = config['SHARED_CACHE']
+        return caches[alias] if alias else None
+
+    def _shared_key(self, key):
+        """Return a shared cache key that does not expose the token"""
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return f'auth:token:{digest}'
+
+    def _get_local_entry(self, key):
+        """Return the cached columns from the in-process tier, or None"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                entry, expires = cached
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    return entry
+                del self._entries[key]
+        return None
+
+    def get_local(self, key):
+        """Return the user for the token from the in-process tier only"""
+        entry = self._get_local_entry(key)
+        if entry is None or not entry['is_active']:
+            return None
+        return entry_to_user(entry)
+
+    def get(self, key):
+        """Return the cached user for the token, or None"""
+        entry = self._get_local_entry(key)
+        if entry is None:
+            config = get_config()
+            shared = self._shared(config)
+            if shared is None:
+                return None
+            entry = shared.get(self._shared_key(key))
+            if entry is None:
+                return None
+            self._store_local(key, entry, config)
+        if not entry['is_active']:
+            return None
+        return entry_to_user(entry)
+
+    def _store_local(self, key, entry, config):
+        """Store the cached columns in the in-process LRU"""
+        if config['MAX_SIZE'] <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (entry, time.monotonic() + config['TTL'])
+            self._entries.move_to_end(key)
+            while len(self._entries) > config['MAX_SIZE']:
+                self._entries.popitem(last=False)
+
+    def set(self, key, user):
+        """Cache the user for the token in every tier"""
+        config = get_config()
+        entry = user_to_entry(user)
+        self._store_local(key, entry, config)
+        shared = self._shared(config)
+        if shared is not None:
+            shared.set(self._shared_key(key), entry, config['SHARED_TTL'])
+
+    def delete(self, *keys):
+        """Drop the tokens from every tier"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        shared = self._shared(get_config())
+        if shared is not None and keys:
+            shared.delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self):
+        """Drop every entry from the in-process tier"""
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def invalidate_user_tokens(user):
+    """Drop cached authentication for every token of the user"""
+    keys = Token.objects.filter(user=user).values_list('key', flat=True)
+    token_cache.delete(*keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token owner"""
+
+    def authenticate(self, request):
+        """Authenticate the request, timed as the auth phase"""
+        with timing.phase('auth'):
+            return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        """Return the user for the token, hitting the database on a miss"""
+        user = token_cache.get(key)
+        if user is not None:
+            return (user, Token(key=key, user=user))
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user)
+        return (user, token)
+
+
+class TokenKeyParser(TokenAuthentication):
+    """TokenAuthentication's header parsing, returning the key itself"""
+
+    def authenticate_credentials(self, key):
+        """Return the key instead of looking it up"""
+        return key
+
+
+class AsyncCachedTokenAuthentication(CachedTokenAuthentication):
+    """Cached token authentication for async views"""
+
+    def get_key(self, request):
+        """Return the token from the Authorization header, if any"""
+        parser = TokenKeyParser()
+        parser.keyword = self.keyword
+        return parser.authenticate(request)
+
+    async def authenticate_async(self, request):
+        """Return the user, leaving the event loop only on a cache miss"""
+        with timing.phase('auth'):
+            return await self._authenticate_async(request)
+
+    async def _authenticate_async(self, request):
+        """Return the user for the token of the request"""
+        key = self.get_key(request)
+        if key is None:
+            return None
+        user = token_cache.get_local(key)
+        if user is not None:
+            return user
+        user, _token = await sync_to_async(self.authenticate_credentials)(key)
+        return user
@@ -0,0 +1,159 @@
+"""
+Helpers for benchmark commands: throwaway data, query plans and latencies
+"""
+import math
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+
+class Rollback(Exception):
+    """Raised to discard the seeded benchmark data"""
+
+
+def seed_recipes(cursor, users, recipes, tags, tag_every):
+    """Insert users, recipes, tags and links with set-based SQL"""
+    cursor.execute(
+        'INSERT INTO core_user (password, email, username, name, '
+        'is_active, is_staff, is_superuser, date_joined) '
+        "SELECT '!', 'bench' || g || '@example.com', 'bench' || g, '', "
+        'true, false, false, now() FROM generate_series(1, %s) g '
+        'RETURNING id',
+        [users],
+    )
+    user_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        'INSERT INTO core_recipe (user_id, title, description, price, '
+        'time_minutes, link, image_variants) '
+        "SELECT u, 'Recipe ' || g, '', 1.00, 10, '', '{}' "
+        'FROM unnest(%s::bigint[]) u, generate_series(1, %s) g',
+        [user_ids, recipes],
+    )
+    cursor.execute(
+        'INSERT INTO core_tag (user_id, name, recipe_count) '
+        "SELECT u, 'Tag ' || g, 0 "
+        'FROM unnest(%s::bigint[]) u, generate_series(1, %s) g',
+        [user_ids, tags],
+    )
+    cursor.execute(
+        'INSERT INTO core_recipe_tags (recipe_id, tag_id) '
+        'SELECT r.id, t.id FROM core_recipe r '
+        'JOIN core_tag t ON t.user_id = r.user_id '
+        'WHERE (r.id * 31 + t.id) %% %s = 0',
+        [tag_every],
+    )
+    cursor.execute('ANALYZE core_recipe, core_tag, core_recipe_tags')
+    return user_ids
+
+
+def seed_ingredients(cursor, user_ids, ingredients, ingredient_every):
+    """Insert ingredients for the users and link them to their recipes"""
+    cursor.execute(
+        'INSERT INTO core_ingredient (user_id, name, recipe_count) '
+        "SELECT u, 'Ingredient ' || g, 0 "
+        'FROM unnest(%s::bigint[]) u, generate_series(1, %s) g',
+        [user_ids, ingredients],
+    )
+    cursor.execute(
+        'INSERT INTO core_recipe_ingredients (recipe_id, ingredient_id) '
+        'SELECT r.id, i.id FROM core_recipe r '
+        'JOIN core_ingredient i ON i.user_id = r.user_id '
+        'WHERE (r.id * 17 + i.id) %% %s = 0',
+        [ingredient_every],
+    )
+    cursor.execute('ANALYZE core_ingredient, core_recipe_ingredients')
+
+
+def explain(querysets):
+    """Return the plan and execution time of each queryset"""
+    results = {}
+    for name, queryset in querysets.items():
+        plan = queryset.explain(analyze=True)
+        match = re.search(r'Execution Time: ([\d.]+) ms', plan)
+        results[name] = (plan, float(match.group(1)) if match else None)
+    return results
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of the values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies, elapsed):
+    """Return throughput and latency percentiles in milliseconds"""
+    if not latencies:
+        return {'requests': 0}
+    return {
+        'requests': len(latencies),
+        'throughput': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+    }
+
+
+class ExplainCommand(BaseCommand):
+    """Base command running EXPLAIN ANALYZE against seeded data"""
+    seed_defaults = {
+        'users': 100,
+        'recipes': 2000,
+        'tags': 50,
+        'tag_every': 10,
+    }
+
+    def add_arguments(self, parser):
+        """Add the seeding arguments"""
+        parser.add_argument('--users', type=int,
+                            default=self.seed_defaults['users'])
+        parser.add_argument('--recipes', type=int,
+                            default=self.seed_defaults['recipes'],
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int,
+                            default=self.seed_defaults['tags'],
+                            help='Tags per user')
+        parser.add_argument('--tag-every', type=int,
+                            default=self.seed_defaults['tag_every'],
+                            help='Roughly one in N tags is used per recipe')
+
+    def run(self, cursor, user_id):
+        """Return {run title: explain results} for the seeded user"""
+        raise NotImplementedError
+
+    def _report(self, title, results):
+        """Write the plans of one run"""
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for name, (plan, elapsed) in results.items():
+            self.stdout.write(f'-- {name}: {elapsed} ms')
+            self.stdout.write(plan)
+
+    def handle(self, *args, **options):
+        """Entrypoint for the command"""
+        if connection.vendor != 'postgresql':
+            raise CommandError('This benchmark requires PostgreSQL')
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                user_ids = seed_recipes(
+                    cursor,
+                    options['users'],
+                    options['recipes'],
+                    options['tags'],
+                    options['tag_every'],
+                )
+                runs = self.run(cursor, user_ids[len(user_ids) // 2])
+                raise Rollback
+        except Rollback:
+            pass
+
+        for title, results in runs.items():
+            self._report(title, results)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Summary: ' + ' -> '.join(runs)))
+        first = next(iter(runs.values()))
+        for name in first:
+            timings = ' -> '.join(
+                f'{results[name][1]} ms' for results in runs.values())
+            self.stdout.write(f'{name}: {timings}')
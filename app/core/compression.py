@@ -0,0 +1,151 @@
+"""
+Brotli and gzip response compression negotiated with Accept-Encoding
+"""
+import zlib
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    'CONTENT_TYPES': (
+        'application/json',
+        'application/x-ndjson',
+        'application/vnd.oai.openapi',
+        'text/',
+    ),
+}
+
+
+def get_config():
+    """Return the compression settings merged with the defaults"""
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_COMPRESSION', {})}
+
+
+def available_encodings():
+    """Return the supported encodings in order of preference"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _qualities(accept_encoding):
+    """Return {coding: q value} of an Accept-Encoding header"""
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def negotiate(request):
+    """Return the encoding to compress the response with, or None"""
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if not accept_encoding or not get_config()['ENABLED']:
+        return None
+    qualities = _qualities(accept_encoding)
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _BrotliCompressor:
+    """Incremental brotli compressor with the zlib object interface"""
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        """Return the compressed output available for data"""
+        return self._compressor.process(data)
+
+    def flush(self):
+        """Return the rest of the compressed stream"""
+        return self._compressor.finish()
+
+
+def compressor(encoding):
+    """Return a compressor with compress() and flush() for the encoding"""
+    config = get_config()
+    if encoding == 'br':
+        return _BrotliCompressor(config['BROTLI_QUALITY'])
+    # wbits 31 writes the gzip header and trailer, with a zero mtime
+    return zlib.compressobj(config['GZIP_LEVEL'], zlib.DEFLATED, 31)
+
+
+def compress(data, encoding):
+    """Return data compressed with the encoding"""
+    stream = compressor(encoding)
+    return stream.compress(data) + stream.flush()
+
+
+def compress_stream(chunks, encoding):
+    """Yield the compressed chunks, as the compressor produces output"""
+    stream = compressor(encoding)
+    for chunk in chunks:
+        data = stream.compress(chunk)
+        if data:
+            yield data
+    yield stream.flush()
+
+
+def _compressible(response):
+    """Return whether the content type of the response is worth it"""
+    content_type = response.get('Content-Type', '').lower()
+    return content_type.startswith(get_config()['CONTENT_TYPES'])
+
+
+def compress_response(request, response):
+    """Compress the response in place when the client accepts it
+
+    Like GZipMiddleware, responses below MIN_SIZE, already encoded or with
+    other content types are left alone, and streaming responses are
+    compressed incrementally with no size check.
+    """
+    if response.has_header('Content-Encoding') or not _compressible(response):
+        return response
+    if not response.streaming \
+            and len(response.content) < get_config()['MIN_SIZE']:
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = negotiate(request)
+    if encoding is None:
+        return response
+
+    if response.streaming:
+        response.streaming_content = compress_stream(
+            response.streaming_content, encoding)
+        del response['Content-Length']
+    else:
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        # The bytes differ from the identity representation
+        response['ETag'] = 'W/' + etag
+    response['Content-Encoding'] = encoding
+    return response
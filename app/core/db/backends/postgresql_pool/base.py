@@ -0,0 +1,43 @@
+"""
+PostgreSQL backend checking connections out of a per-process pool
+"""
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import (
+    DatabaseCreation as PostgresDatabaseCreation,
+)
+from core.db.pool import close_pools, get_pool
+
+
+class DatabaseCreation(PostgresDatabaseCreation):
+    """Close pooled connections before the test database is dropped"""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        """Drop the test database once no pooled connection uses it"""
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connection returned to a pool instead of being closed"""
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        """Check out a pooled connection, connecting when none is idle"""
+        pool = self.pool = get_pool(
+            self.alias, conn_params, self.settings_dict)
+
+        def connect():
+            return super(DatabaseWrapper, self).get_new_connection(
+                conn_params)
+
+        pool.fill(connect)
+        connection = pool.getconn(connect)
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        """Return the connection to the pool"""
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
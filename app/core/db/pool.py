@@ -0,0 +1,231 @@
+"""
+Per-process pool of PostgreSQL connections for the pooled backend
+"""
+import os
+import threading
+import time
+from collections import deque
+import psycopg2
+from psycopg2 import extensions
+
+
+DEFAULTS = {
+    'MIN_SIZE': 0,
+    'MAX_SIZE': 10,
+    'MAX_LIFETIME': 1800,
+    'TIMEOUT': 10,
+    'CHECK': True,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection was returned to a full pool in time"""
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of connections with a maximum lifetime"""
+
+    def __init__(self, min_size, max_size, max_lifetime, timeout, check):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.check = check
+        self.pid = os.getpid()
+        self._idle = deque()
+        self._created = {}
+        self._size = 0
+        self._condition = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'connects': 0,
+            'closes': 0,
+            'failed_checks': 0,
+            'waits': 0,
+            'timeouts': 0,
+        }
+
+    def _expired(self, conn):
+        """Return whether the connection has outlived its lifetime"""
+        created = self._created.get(conn, 0)
+        return time.monotonic() - created > self.max_lifetime
+
+    def _discard(self, conn):
+        """Close a connection and free its slot, holding the lock"""
+        self._created.pop(conn, None)
+        self._size -= 1
+        self._stats['closes'] += 1
+        self._condition.notify()
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_alive(self, conn):
+        """Return whether the connection still answers queries"""
+        if conn.closed:
+            return False
+        if not self.check:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if conn.get_transaction_status() != \
+                    extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _reserve(self):
+        """Return an idle connection or None after reserving a new slot"""
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                while self._idle:
+                    conn = self._idle.pop()
+                    if conn.closed or self._expired(conn):
+                        self._discard(conn)
+                        continue
+                    return conn
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'No connection available within {self.timeout}s '
+                        f'(pool size {self.max_size})')
+                self._stats['waits'] += 1
+                self._condition.wait(remaining)
+
+    def _connect(self, connect):
+        """Open a connection for a reserved slot"""
+        try:
+            conn = connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._created[conn] = time.monotonic()
+            self._stats['connects'] += 1
+        return conn
+
+    def getconn(self, connect):
+        """Check out a live connection, opening one with connect if needed"""
+        while True:
+            conn = self._reserve()
+            if conn is None:
+                conn = self._connect(connect)
+            elif not self._is_alive(conn):
+                with self._condition:
+                    self._stats['failed_checks'] += 1
+                    self._discard(conn)
+                continue
+            with self._condition:
+                self._stats['checkouts'] += 1
+            return conn
+
+    def putconn(self, conn):
+        """Return a connection, closing it when it cannot be reused"""
+        reusable = not conn.closed and not self._expired(conn)
+        if reusable:
+            status = conn.get_transaction_status()
+            try:
+                if status in (extensions.TRANSACTION_STATUS_INTRANS,
+                              extensions.TRANSACTION_STATUS_INERROR):
+                    conn.rollback()
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    reusable = False
+            except psycopg2.Error:
+                reusable = False
+        with self._condition:
+            if conn not in self._created:
+                # Opened by the pool of a parent process, left to its owner
+                return
+            if reusable:
+                self._idle.append(conn)
+                self._condition.notify()
+            else:
+                self._discard(conn)
+
+    def fill(self, connect):
+        """Open connections until the pool holds its minimum size"""
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            conn = self._connect(connect)
+            self.putconn(conn)
+
+    def close(self):
+        """Close every idle connection"""
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop())
+
+    def stats(self):
+        """Return a snapshot of the pool counters and sizes"""
+        with self._condition:
+            return {
+                **self._stats,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+            }
+
+
+def get_config(settings_dict):
+    """Return the pool settings of a database merged with the defaults"""
+    return {**DEFAULTS, **settings_dict.get('POOL', {})}
+
+
+def get_pool(alias, conn_params, settings_dict):
+    """Return the pool of this process for the database and parameters"""
+    key = (alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            # A forked worker must not share the parent's sockets, so the
+            # inherited pool is dropped without closing its connections.
+            config = get_config(settings_dict)
+            pool = ConnectionPool(
+                min_size=config['MIN_SIZE'],
+                max_size=config['MAX_SIZE'],
+                max_lifetime=config['MAX_LIFETIME'],
+                timeout=config['TIMEOUT'],
+                check=config['CHECK'],
+            )
+            _pools[key] = pool
+        return pool
+
+
+def stats():
+    """Return the statistics of every pool of this process by alias"""
+    with _pools_lock:
+        pools = [
+            (alias, pool) for (alias, _), pool in _pools.items()
+            if pool.pid == os.getpid()
+        ]
+    result = {}
+    for alias, pool in pools:
+        for name, value in pool.stats().items():
+            result.setdefault(alias, {}).setdefault(name, 0)
+            result[alias][name] += value
+    return result
+
+
+def close_pools():
+    """Close the idle connections of every pool of this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close()
@@ -0,0 +1,47 @@
+"""
+Per-request SQL recorders that follow the request across threads
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# sync_to_async copies the context, so the queries a request runs on
+# executor threads reach the recorders set where the request started
+recorders = ContextVar('sql_recorders', default=())
+
+
+def execute(execute, sql, params, many, context):
+    """Execute wrapper passing each query and its duration to recorders"""
+    current = recorders.get()
+    if not current:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        for record in current:
+            record(sql, elapsed)
+
+
+@receiver(connection_created)
+def install(sender, connection, **kwargs):
+    """Trace the queries of a connection"""
+    if execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute)
+
+
+@contextmanager
+def recording(record):
+    """Call record(sql, seconds) for the queries of the current context"""
+    # Connections opened before this module was imported
+    for connection in connections.all():
+        install(None, connection)
+    token = recorders.set(recorders.get() + (record,))
+    try:
+        yield
+    finally:
+        recorders.reset(token)
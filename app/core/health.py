@@ -0,0 +1,83 @@
+"""
+Liveness and readiness checks with cached results
+"""
+import threading
+import time
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+
+
+DEFAULTS = {
+    'CACHE_TTL': 5,
+}
+
+
+def get_config():
+    """Return the health check settings merged with the defaults"""
+    return {**DEFAULTS, **getattr(settings, 'HEALTH_CHECKS', {})}
+
+
+def check_database():
+    """Return None if the database answers, otherwise the error"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError as exc:
+        return str(exc).strip() or exc.__class__.__name__
+    return None
+
+
+def check_migrations():
+    """Return None if every migration is applied, otherwise the count"""
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        return f'{len(plan)} unapplied migrations'
+    return None
+
+
+class Readiness:
+    """Readiness state recomputed at most once per CACHE_TTL seconds"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._result = None
+        self._expires = 0
+        self._migrated = False
+
+    def _run_checks(self):
+        """Return the outcome of every check by name"""
+        checks = {'database': check_database()}
+        if checks['database'] is not None:
+            checks['migrations'] = 'skipped'
+        elif not self._migrated:
+            # Applied migrations stay applied for the life of the process
+            checks['migrations'] = check_migrations()
+            self._migrated = checks['migrations'] is None
+        else:
+            checks['migrations'] = None
+        return checks
+
+    def get(self):
+        """Return (ready, checks), running the checks if the cache expired"""
+        with self._lock:
+            now = time.monotonic()
+            if self._result is None or now >= self._expires:
+                checks = self._run_checks()
+                ready = all(value is None for value in checks.values())
+                self._result = (ready, {
+                    name: 'ok' if value is None else value
+                    for name, value in checks.items()
+                })
+                self._expires = now + get_config()['CACHE_TTL']
+            return self._result
+
+    def clear(self):
+        """Forget the cached result"""
+        with self._lock:
+            self._result = None
+            self._migrated = False
+
+
+readiness = Readiness()
@@ -0,0 +1,139 @@
+"""
+Background jobs stored in PostgreSQL and claimed with SKIP LOCKED
+"""
+import logging
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from core.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF': 5,
+    'MAX_BACKOFF': 600,
+    'LOCK_TIMEOUT': 900,
+}
+
+
+def get_config():
+    """Return the job queue settings merged with the defaults"""
+    return {**DEFAULTS, **getattr(settings, 'JOBS', {})}
+
+
+def task_path(task):
+    """Return the dotted import path of a task function"""
+    if callable(task):
+        return f'{task.__module__}.{task.__qualname__}'
+    return task
+
+
+def enqueue(task, user=None, delay=0, max_attempts=None, **payload):
+    """Queue a call of the task with JSON serializable keyword arguments"""
+    return Job.objects.create(
+        task=task_path(task),
+        payload=payload,
+        user=user,
+        max_attempts=max_attempts or get_config()['MAX_ATTEMPTS'],
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def backoff(attempts):
+    """Return the seconds to wait before retrying after a failed attempt"""
+    config = get_config()
+    return min(config['BACKOFF'] * 2 ** (attempts - 1), config['MAX_BACKOFF'])
+
+
+def claim(worker, limit):
+    """Mark up to limit due jobs as running for the worker"""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True).filter(
+                status=Job.QUEUED,
+                run_at__lte=now,
+            ).order_by('run_at', 'id').values_list('id', flat=True)[:limit]
+        )
+        Job.objects.filter(id__in=ids).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_by=worker,
+            locked_at=now,
+        )
+    return ids
+
+
+def requeue_stale():
+    """Return jobs of workers that died mid-run to the queue"""
+    stale = timezone.now() - timedelta(seconds=get_config()['LOCK_TIMEOUT'])
+    with transaction.atomic():
+        jobs = Job.objects.filter(status=Job.RUNNING, locked_at__lt=stale)
+        retry = jobs.filter(attempts__lt=F('max_attempts')).update(
+            status=Job.QUEUED,
+            locked_by='',
+            locked_at=None,
+            last_error='Worker lock timed out',
+        )
+        failed = jobs.update(
+            status=Job.FAILED,
+            finished_at=timezone.now(),
+            last_error='Worker lock timed out',
+        )
+    return retry + failed
+
+
+def _finish(job, **fields):
+    """Record the outcome unless the job was reclaimed in the meantime"""
+    return Job.objects.filter(
+        id=job.id,
+        status=Job.RUNNING,
+        attempts=job.attempts,
+    ).update(locked_by='', locked_at=None, **fields)
+
+
+def execute(job_id):
+    """Run a claimed job, scheduling a retry with backoff if it fails"""
+    job = Job.objects.get(id=job_id)
+    try:
+        import_string(job.task)(**job.payload)
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.id, job.task)
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            _finish(
+                job,
+                status=Job.FAILED,
+                finished_at=timezone.now(),
+                last_error=error,
+            )
+        else:
+            delay = timedelta(seconds=backoff(job.attempts))
+            _finish(
+                job,
+                status=Job.QUEUED,
+                run_at=timezone.now() + delay,
+                last_error=error,
+            )
+        return False
+    _finish(job, status=Job.SUCCEEDED, finished_at=timezone.now())
+    return True
+
+
+def run(job_id):
+    """Execute a job on a worker thread or process"""
+    close_old_connections()
+    try:
+        return execute(job_id)
+    finally:
+        # Pool threads can exit without closing a persistent connection,
+        # leaving the session open until it is garbage collected
+        connections.close_all()
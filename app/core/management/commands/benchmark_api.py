@@ -0,0 +1,276 @@
+"""
+    Django command to benchmark the API endpoints against seeded data
+"""
+
+import io
+import json
+import statistics
+import subprocess
+import time
+from urllib.parse import unquote, urlparse
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core.authentication import token_cache
+from core.benchmark import (
+    Rollback,
+    seed_ingredients,
+    seed_recipes,
+    summarize,
+)
+from core.models import Ingredient, Recipe, Tag
+
+
+PASSWORD = 'benchmark-password'
+
+
+def git_revision():
+    """Return the checked out commit, if the source is a git work tree"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def jpeg_bytes(size):
+    """Return a generated JPEG image of the size"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 120, 40)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    """Seed data, then time requests through the full Django stack"""
+    help = (
+        'Measure throughput, p50/p99 latency and query counts of the main '
+        'API endpoints against seeded data and write a JSON report. The '
+        'data is rolled back afterwards. Never use on production.'
+    )
+
+    def add_arguments(self, parser):
+        """Add the command line arguments"""
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=200,
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=50,
+                            help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=100,
+                            help='Ingredients per user')
+        parser.add_argument('--tag-every', type=int, default=10,
+                            help='Roughly one in N tags is used per recipe')
+        parser.add_argument('--ingredient-every', type=int, default=15,
+                            help='Roughly one in N ingredients per recipe')
+        parser.add_argument('--iterations', type=int, default=50,
+                            help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Untimed requests per scenario')
+        parser.add_argument('--scenario', action='append', dest='only',
+                            help='Only run the named scenario, repeatable')
+        parser.add_argument('--cache', action='store_true',
+                            help='Keep the response cache enabled')
+        parser.add_argument('--output',
+                            help='Write the JSON report to this file')
+        parser.add_argument('--compare',
+                            help='Report to show the changes against')
+
+    def scenarios(self, user, uploads):
+        """Return {name: function returning a response} for the user"""
+        def used_ids(model):
+            ids = model.objects.filter(
+                user=user, recipe_count__gt=0,
+            ).order_by('id').values_list('id', flat=True)[:3]
+            return ','.join(str(pk) for pk in ids)
+
+        tag_ids = used_ids(Tag)
+        ingredient_ids = used_ids(Ingredient)
+        recipe = Recipe.objects.filter(user=user).order_by('id').first()
+        recipes_url = reverse('recipe:recipe-list')
+        upload_url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+        image = jpeg_bytes((1200, 800))
+        counter = iter(range(10 ** 9))
+
+        def create_recipe(client):
+            n = next(counter)
+            return client.post(recipes_url, {
+                'title': f'Benchmark recipe {n}',
+                'price': '5.00',
+                'time_minutes': 20,
+                'tags': [
+                    {'name': 'Tag 1'},
+                    {'name': 'Tag 2'},
+                    {'name': f'Benchmark {n}'},
+                ],
+            }, format='json')
+
+        def upload_image(client):
+            upload = SimpleUploadedFile(
+                'benchmark.jpg', image, content_type='image/jpeg')
+            response = client.post(
+                upload_url, {'image': upload}, format='multipart')
+            if response.status_code == 200:
+                path = unquote(urlparse(response.data['image']).path)
+                uploads.append(path[len(settings.MEDIA_URL):])
+            return response
+
+        def login(client):
+            return APIClient().post(reverse('user:token'), {
+                'email': user.email,
+                'password': PASSWORD,
+            })
+
+        return {
+            'recipe list': lambda client: client.get(recipes_url),
+            'recipe list by tags': lambda client: client.get(
+                recipes_url, {'tags': tag_ids}),
+            'recipe list by ingredients': lambda client: client.get(
+                recipes_url, {'ingredients': ingredient_ids}),
+            'recipe create with tags': create_recipe,
+            'tag list assigned only': lambda client: client.get(
+                reverse('recipe:tag-list'), {'assigned_only': 1}),
+            'ingredient list assigned only': lambda client: client.get(
+                reverse('recipe:ingredient-list'), {'assigned_only': 1}),
+            'token login': login,
+            'image upload': upload_image,
+        }
+
+    def measure(self, request, client, options):
+        """Time one scenario, returning its summary"""
+        for _ in range(options['warmup']):
+            request(client)
+        latencies, queries, statuses = [], [], set()
+        start = time.perf_counter()
+        for _ in range(options['iterations']):
+            with CaptureQueriesContext(connection) as captured:
+                began = time.perf_counter()
+                response = request(client)
+                latencies.append(time.perf_counter() - began)
+            queries.append(len(captured))
+            statuses.add(response.status_code)
+        report = summarize(latencies, time.perf_counter() - start)
+        if queries:
+            report['queries'] = statistics.median_low(queries)
+            report['max_queries'] = max(queries)
+        report['statuses'] = sorted(statuses)
+        return report
+
+    def run(self, options):
+        """Seed the data and run every selected scenario"""
+        with connection.cursor() as cursor:
+            user_ids = seed_recipes(
+                cursor,
+                options['users'],
+                options['recipes'],
+                options['tags'],
+                options['tag_every'],
+            )
+            seed_ingredients(
+                cursor,
+                user_ids,
+                options['ingredients'],
+                options['ingredient_every'],
+            )
+        user = get_user_model().objects.get(
+            id=user_ids[len(user_ids) // 2])
+        user.set_password(PASSWORD)
+        user.save(update_fields=['password'])
+        token = Token.objects.create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        uploads = []
+        scenarios = self.scenarios(user, uploads)
+        unknown = set(options['only'] or []) - set(scenarios)
+        if unknown:
+            raise CommandError(
+                f'Unknown scenarios: {", ".join(sorted(unknown))}')
+        results = {}
+        try:
+            for name, request in scenarios.items():
+                if not options['only'] or name in options['only']:
+                    self.stdout.write(f'Running {name}...')
+                    results[name] = self.measure(request, client, options)
+        finally:
+            # Files are not covered by the rollback, variants are never
+            # generated as their jobs and on_commit hooks are discarded
+            for name in uploads:
+                default_storage.delete(name)
+            token_cache.delete(token.key)
+        return results
+
+    def _compare(self, results, path):
+        """Write the relative change of each result against a report"""
+        with open(path) as f:
+            previous = json.load(f)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Compared to {previous.get("revision") or path}'))
+        for name, report in results.items():
+            before = previous['scenarios'].get(name)
+            if not before or not report['requests'] \
+                    or not before['requests']:
+                continue
+            changes = []
+            for key in ('throughput', 'p50_ms', 'p99_ms', 'queries'):
+                if before.get(key):
+                    change = (report[key] - before[key]) / before[key]
+                    changes.append(f'{key} {change:+.1%}')
+            self.stdout.write(f'{name}: {", ".join(changes)}')
+
+    def handle(self, *args, **options):
+        """Entrypoint for the command"""
+        if connection.vendor != 'postgresql':
+            raise CommandError('This benchmark requires PostgreSQL')
+        overrides = {
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+        }
+        if not options['cache']:
+            overrides['RESPONSE_CACHE'] = {
+                **getattr(settings, 'RESPONSE_CACHE', {}),
+                'ENABLED': False,
+            }
+        try:
+            with override_settings(**overrides), transaction.atomic():
+                results = self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+        report = {
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'options': {
+                key: options[key] for key in (
+                    'users', 'recipes', 'tags', 'ingredients', 'tag_every',
+                    'ingredient_every', 'iterations', 'warmup', 'cache',
+                )
+            },
+            'scenarios': results,
+        }
+        for name, result in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            if not result['requests']:
+                continue
+            self.stdout.write(
+                '{requests} requests, {throughput} req/s, '
+                'p50 {p50_ms} ms, p99 {p99_ms} ms, max {max_ms} ms, '
+                '{queries} queries, statuses {statuses}'.format(**result))
+        if options['compare']:
+            self._compare(results, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f'Report written to {options["output"]}')
@@ -0,0 +1,51 @@
+"""
+    Django command to compare join/DISTINCT and EXISTS recipe filtering
+"""
+
+from django.db.models import Count, Exists, OuterRef
+from core.benchmark import ExplainCommand, explain
+from core.models import Recipe, Tag
+
+
+class Command(ExplainCommand):
+    """Seed recipes with many tags and EXPLAIN ANALYZE both filter styles"""
+    help = (
+        'Show query plans of tag filtering with joins and DISTINCT versus '
+        'EXISTS subqueries. Never use on production.'
+    )
+    seed_defaults = {
+        **ExplainCommand.seed_defaults,
+        'tags': 200,
+        'tag_every': 3,
+    }
+
+    def run(self, cursor, user_id):
+        """Explain the old and new shapes of the tag filters"""
+        tag_ids = list(
+            Tag.objects.filter(user_id=user_id)
+            .order_by('id').values_list('id', flat=True)[:5]
+        )
+        recipes = Recipe.objects.filter(user_id=user_id)
+        links = Recipe.tags.through.objects.filter(tag_id__in=tag_ids)
+
+        match_all_join = recipes
+        for tag_id in tag_ids:
+            match_all_join = match_all_join.filter(tags__id=tag_id)
+        match_all_ids = links.values('recipe_id').annotate(
+            matched=Count('tag_id'),
+        ).filter(matched=len(tag_ids)).values('recipe_id')
+
+        return {
+            'Join + DISTINCT': explain({
+                'any tag': recipes.filter(
+                    tags__id__in=tag_ids).order_by('-id').distinct()[:50],
+                'all tags': match_all_join.order_by('-id').distinct()[:50],
+            }),
+            'EXISTS / grouped counts': explain({
+                'any tag': recipes.filter(
+                    Exists(links.filter(recipe_id=OuterRef('pk')))
+                ).order_by('-id')[:50],
+                'all tags': recipes.filter(
+                    id__in=match_all_ids).order_by('-id')[:50],
+            }),
+        }
@@ -0,0 +1,46 @@
+"""
+    Django command to compare query plans with and without the query indexes
+"""
+
+from core.benchmark import ExplainCommand, explain
+from core.models import Recipe, Tag
+
+
+INDEXES = [
+    'recipe_user_id_desc_idx',
+    'recipe_tags_tag_recipe_idx',
+    'recipe_ingr_ingr_recipe_idx',
+]
+
+
+class Command(ExplainCommand):
+    """Seed throwaway data and EXPLAIN ANALYZE the hot query shapes"""
+    help = (
+        'Show query plans with and without the composite indexes. '
+        'Locks the recipe tables while running, never use on production.'
+    )
+
+    def _querysets(self, user_id):
+        """Return the query shapes issued by the api"""
+        tag = Tag.objects.filter(user_id=user_id).order_by('id').first()
+        return {
+            'recipe list': Recipe.objects.filter(
+                user_id=user_id).order_by('-id')[:50],
+            'tag list': Tag.objects.filter(
+                user_id=user_id).order_by('-name')[:50],
+            'tag lookup by name': Tag.objects.filter(
+                user_id=user_id, name__in=['Tag 1', 'Tag 2']),
+            'recipes by tag': Recipe.tags.through.objects.filter(
+                tag_id=tag.id).values('recipe_id'),
+        }
+
+    def run(self, cursor, user_id):
+        """Explain the queries before and after dropping the indexes"""
+        querysets = self._querysets(user_id)
+        with_indexes = explain(querysets)
+        for index in INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {index}')
+        return {
+            'Without indexes': explain(querysets),
+            'With indexes': with_indexes,
+        }
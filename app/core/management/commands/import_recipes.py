@@ -0,0 +1,234 @@
+"""
+    Django command to bulk import recipes from NDJSON or CSV files
+"""
+
+import csv
+import io
+import json
+import os
+from decimal import Decimal, InvalidOperation
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import response_cache
+
+
+RECIPE_COLUMNS = ['title', 'description', 'price', 'time_minutes', 'link']
+
+RELATED = {
+    'tags': Tag,
+    'ingredients': Ingredient,
+}
+
+
+def _names(value):
+    """Return related names from a list of names/objects or a|b string"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split('|')
+    return [
+        (item['name'] if isinstance(item, dict) else str(item)).strip()
+        for item in value
+        if item
+    ]
+
+
+def read_ndjson(stream):
+    """Yield recipe dicts from newline delimited JSON"""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(stream):
+    """Yield recipe dicts from CSV with '|' separated tags/ingredients"""
+    yield from csv.DictReader(stream)
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+class Command(BaseCommand):
+    """Django command to bulk import recipes using PostgreSQL COPY"""
+    help = 'Import recipes with tags and ingredients for a user'
+
+    def add_arguments(self, parser):
+        """Add the command line arguments"""
+        parser.add_argument('files', nargs='+')
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Email of the user owning the imported recipes',
+        )
+        parser.add_argument(
+            '--format',
+            choices=list(READERS),
+            help='Input format, inferred from the file extension by default',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50000,
+            help='Rows buffered in memory before each COPY',
+        )
+
+    def _quote(self, name):
+        """Quote a table or column name"""
+        return connection.ops.quote_name(name)
+
+    def _clean(self, row, location):
+        """Return a staging row for the recipe, validating its values"""
+        try:
+            price = Decimal(str(row['price']))
+            time_minutes = int(row['time_minutes'])
+            title = row['title']
+        except (KeyError, TypeError, ValueError, InvalidOperation) as exc:
+            raise CommandError(f'{location}: invalid recipe ({exc!r})')
+        if not title or len(title) > 255:
+            raise CommandError(f'{location}: invalid recipe title')
+        return [
+            title,
+            row.get('description') or '',
+            price,
+            time_minutes,
+            row.get('link') or '',
+        ]
+
+    def _create_staging(self, cursor):
+        """Create temporary staging tables for the import"""
+        cursor.execute(
+            'CREATE TEMP TABLE import_recipe ('
+            'seq bigint PRIMARY KEY, recipe_id bigint, title text, '
+            'description text, price numeric(5, 2), time_minutes integer, '
+            'link text)'
+        )
+        for field_name in RELATED:
+            cursor.execute(
+                f'CREATE TEMP TABLE import_recipe_{field_name} '
+                '(seq bigint, name text)'
+            )
+
+    def _copy(self, cursor, table, columns, rows):
+        """Load rows into a staging table with COPY"""
+        if not rows:
+            return
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(
+            f'COPY {table} ({", ".join(columns)}) FROM STDIN '
+            'WITH (FORMAT csv)',
+            buffer,
+        )
+
+    def _stage(self, cursor, paths, file_format, batch_size):
+        """Stream the input files into the staging tables"""
+        seq = 0
+        recipes = []
+        related = {field_name: [] for field_name in RELATED}
+
+        def flush():
+            self._copy(
+                cursor, 'import_recipe', ['seq'] + RECIPE_COLUMNS, recipes)
+            for field_name, rows in related.items():
+                self._copy(
+                    cursor, f'import_recipe_{field_name}',
+                    ['seq', 'name'], rows)
+                rows.clear()
+            recipes.clear()
+
+        for path in paths:
+            reader = READERS[
+                file_format or os.path.splitext(path)[1].lstrip('.').lower()
+            ]
+            with open(path, newline='', encoding='utf-8') as stream:
+                for number, row in enumerate(reader(stream), start=1):
+                    seq += 1
+                    location = f'{path}:{number}'
+                    recipes.append([seq] + self._clean(row, location))
+                    for field_name, rows in related.items():
+                        rows.extend(
+                            [seq, name]
+                            for name in dict.fromkeys(
+                                _names(row.get(field_name)))
+                            if name
+                        )
+                    if len(recipes) >= batch_size:
+                        flush()
+        flush()
+        return seq
+
+    def _merge(self, cursor, user):
+        """Merge the staging tables into the recipe tables"""
+        recipe_table = self._quote(Recipe._meta.db_table)
+        columns = ', '.join(RECIPE_COLUMNS)
+        cursor.execute(
+            'UPDATE import_recipe i SET recipe_id = n.recipe_id FROM ('
+            'SELECT seq, nextval(pg_get_serial_sequence(%s, %s)) AS recipe_id '
+            'FROM (SELECT seq FROM import_recipe ORDER BY seq) o'
+            ') n WHERE n.seq = i.seq',
+            [Recipe._meta.db_table, 'id'],
+        )
+        cursor.execute(
+            f'INSERT INTO {recipe_table} '
+            f'(id, user_id, {columns}, image_variants) '
+            f"SELECT recipe_id, %s, {columns}, '{{}}' FROM import_recipe",
+            [user.id],
+        )
+
+        for field_name, model in RELATED.items():
+            table = self._quote(model._meta.db_table)
+            field = Recipe._meta.get_field(field_name)
+            through = self._quote(field.remote_field.through._meta.db_table)
+            source = self._quote(field.m2m_column_name())
+            target = self._quote(field.m2m_reverse_name())
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, name, recipe_count) '
+                'SELECT DISTINCT %s, name, 0 '
+                f'FROM import_recipe_{field_name} '
+                'ON CONFLICT (user_id, name) DO NOTHING',
+                [user.id],
+            )
+            cursor.execute(
+                f'INSERT INTO {through} ({source}, {target}) '
+                'SELECT DISTINCT r.recipe_id, t.id '
+                f'FROM import_recipe_{field_name} s '
+                'JOIN import_recipe r ON r.seq = s.seq '
+                f'JOIN {table} t ON t.user_id = %s AND t.name = s.name '
+                'ON CONFLICT DO NOTHING',
+                [user.id],
+            )
+
+    def handle(self, *args, **options):
+        """Entrypoint for the command"""
+        if connection.vendor != 'postgresql':
+            raise CommandError('import_recipes requires PostgreSQL')
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist')
+        for path in options['files']:
+            extension = os.path.splitext(path)[1].lstrip('.').lower()
+            if not options['format'] and extension not in READERS:
+                raise CommandError(f'{path}: unknown format, use --format')
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._create_staging(cursor)
+            total = self._stage(
+                cursor,
+                options['files'],
+                options['format'],
+                options['batch_size'],
+            )
+            self._merge(cursor, user)
+            cursor.execute(
+                'DROP TABLE import_recipe, import_recipe_tags, '
+                'import_recipe_ingredients'
+            )
+        response_cache.invalidate(user.id)
+        self.stdout.write(self.style.SUCCESS(f'Imported {total} recipes'))
@@ -0,0 +1,86 @@
+"""
+    Django command to compare endpoint throughput and tail latency under load
+"""
+
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+from django.core.management.base import BaseCommand
+from core.benchmark import summarize
+
+
+def fetch(url, headers, timeout):
+    """Request the url, returning the status and the elapsed seconds"""
+    start = time.perf_counter()
+    try:
+        with urlopen(Request(url, headers=headers), timeout=timeout) as res:
+            res.read()
+            code = res.status
+    except HTTPError as exc:
+        code = exc.code
+    except (URLError, OSError):
+        code = 'error'
+    return code, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    """Django command to load test running servers"""
+    help = (
+        'Send concurrent GET requests to each url, e.g. the same endpoint '
+        'on a WSGI and an ASGI server, and report throughput and latency.'
+    )
+
+    def add_arguments(self, parser):
+        """Add the command line arguments"""
+        parser.add_argument('urls', nargs='+')
+        parser.add_argument(
+            '--token',
+            help='Token sent in the Authorization header',
+        )
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Write the report as JSON',
+        )
+
+    def _run(self, url, headers, options):
+        """Load test a single url"""
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            start = time.perf_counter()
+            results = list(pool.map(
+                lambda _: fetch(url, headers, options['timeout']),
+                range(options['requests']),
+            ))
+            elapsed = time.perf_counter() - start
+        statuses = Counter(str(code) for code, _ in results)
+        report = summarize([seconds for _, seconds in results], elapsed)
+        report['statuses'] = dict(statuses)
+        return report
+
+    def handle(self, *args, **options):
+        """Entrypoint for the command"""
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        reports = {
+            url: self._run(url, headers, options) for url in options['urls']
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(reports, indent=2))
+            return
+        for url, report in reports.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(url))
+            if not report['requests']:
+                continue
+            self.stdout.write(
+                '{requests} requests, {throughput} req/s, '
+                'p50 {p50_ms} ms, p99 {p99_ms} ms, max {max_ms} ms'.format(
+                    **report))
+            self.stdout.write(f'statuses: {report["statuses"]}')
@@ -0,0 +1,128 @@
+"""
+    Django command to run background jobs from the database queue
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core import jobs
+
+
+class Command(BaseCommand):
+    """Django command to claim and run queued jobs"""
+    help = 'Run queued background jobs until stopped'
+
+    def add_arguments(self, parser):
+        """Add the command line arguments"""
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Jobs run at the same time',
+        )
+        parser.add_argument(
+            '--pool',
+            choices=['thread', 'process'],
+            default='thread',
+            help='Run jobs on worker threads or processes',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait for new jobs when the queue is empty',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling',
+        )
+
+    def _executor(self, pool, concurrency):
+        """Return the pool the jobs are run on"""
+        if pool == 'thread':
+            return ThreadPoolExecutor(
+                max_workers=concurrency,
+                thread_name_prefix='job-worker',
+            )
+        # Spawned processes set up Django themselves instead of inheriting
+        # the parent's database connections.
+        connections.close_all()
+        return ProcessPoolExecutor(
+            max_workers=concurrency,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+
+    def _stop(self, signum, frame):
+        """Finish the running jobs and exit"""
+        self.stdout.write('Stopping after the running jobs...')
+        self.stopping = True
+
+    def _collect(self, futures):
+        """Count the outcome of finished jobs"""
+        for future in futures:
+            try:
+                ok = future.result()
+            except Exception as exc:
+                self.stderr.write(f'Job crashed the worker: {exc!r}')
+                ok = False
+            self.counts['succeeded' if ok else 'failed'] += 1
+
+    def _work(self, executor, worker, options):
+        """Claim jobs whenever the pool has capacity until stopped"""
+        concurrency = options['concurrency']
+        poll_interval = options['poll_interval']
+        running = set()
+        while not self.stopping:
+            jobs.requeue_stale()
+            for job_id in jobs.claim(worker, concurrency - len(running)):
+                running.add(executor.submit(jobs.run, job_id))
+            if not running:
+                if options['burst']:
+                    break
+                time.sleep(poll_interval)
+                continue
+            done, running = wait(
+                running,
+                timeout=poll_interval,
+                return_when=FIRST_COMPLETED,
+            )
+            self._collect(done)
+        self._collect(running)
+
+    def handle(self, *args, **options):
+        """Entrypoint for the command"""
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+        self.counts = {'succeeded': 0, 'failed': 0}
+        previous = {
+            signum: signal.signal(signum, self._stop)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        self.stdout.write(
+            f'Worker {worker} running {options["concurrency"]} '
+            f'{options["pool"]}s')
+        try:
+            with self._executor(
+                options['pool'], options['concurrency']
+            ) as executor:
+                self._work(executor, worker, options)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Worker stopped: {succeeded} succeeded, {failed} failed'.format(
+                **self.counts)))
@@ -5,21 +5,50 @@
 import time
 from psycopg2 import OperationalError as Psycopg2Error
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
 
+    def add_arguments(self, parser):
+        """Add the command line arguments"""
+        parser.add_argument(
+            '--initial-delay',
+            type=float,
+            default=0.1,
+            help='Seconds to wait after the first failed attempt',
+        )
+        parser.add_argument(
+            '--max-delay',
+            type=float,
+            default=2.0,
+            help='Upper bound of the doubling delay between attempts',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60.0,
+            help='Give up after this many seconds',
+        )
+
     def handle(self, *args, **options):
         """Entrypoint for the command"""
         self.stdout.write('Waiting for database...')
-        db_up = False
-        while db_up is False:
+        delay = options['initial_delay']
+        deadline = time.monotonic() + options['timeout']
+        while True:
             try:
                 self.check(databases=['default'])
-                db_up = True
+                break
             except (Psycopg2Error, OperationalError):
-                self.stdout.write('Database unavailable, waiting 2 second...')
-                time.sleep(2)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f'Database unavailable after {options["timeout"]}s')
+                delay = min(delay, options['max_delay'], remaining)
+                self.stdout.write(
+                    f'Database unavailable, waiting {delay:.2f} seconds...')
+                time.sleep(delay)
+                delay *= 2
         self.stdout.write(self.style.SUCCESS('Database available!'))
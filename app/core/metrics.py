@@ -0,0 +1,278 @@
+"""
+Request metrics exposed in the Prometheus text format
+"""
+import bisect
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+import weakref
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from core.db import pool
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'DIR': None,
+    'FLUSH_INTERVAL': 5,
+    'TOKEN': None,
+    'ALLOW_ANONYMOUS': False,
+    'BUCKETS': (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+    ),
+}
+
+HELP = {
+    'http_requests_total': ('counter', 'Requests by view, method and status'),
+    'http_request_duration_seconds': (
+        'histogram', 'Request latency by view and method'),
+    'http_request_sql_queries_total': (
+        'counter', 'SQL queries executed by view'),
+    'http_request_sql_duration_seconds_total': (
+        'counter', 'Time spent in SQL queries by view'),
+    'db_pool_connections': (
+        'gauge', 'Pooled database connections by alias and state'),
+}
+
+
+def get_config():
+    """Return the metrics settings merged with the defaults"""
+    return {**DEFAULTS, **getattr(settings, 'METRICS', {})}
+
+
+def can_scrape(request):
+    """Return whether the request may read the metrics
+
+    Scrapers send the bearer TOKEN, staff can look from a session, and
+    anyone only when ALLOW_ANONYMOUS is set.
+    """
+    config = get_config()
+    token = config['TOKEN']
+    if token and constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    ):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_staff) \
+        or config['ALLOW_ANONYMOUS']
+
+
+def _add_shard(target, shard):
+    """Add the counters and histograms of a shard into target"""
+    target_counters, target_histograms = target
+    counters, histograms = shard
+    # dict.copy() and list() are atomic under the GIL
+    for key, value in counters.copy().items():
+        target_counters[key] = target_counters.get(key, 0) + value
+    for key, value in histograms.copy().items():
+        merged = target_histograms.setdefault(key, [0] * len(value))
+        for index, count in enumerate(list(value)):
+            merged[index] += count
+
+
+class Registry:
+    """Counters and histograms sharded per thread to avoid a shared lock
+
+    The shard of a thread is folded into the base totals once the thread
+    is gone, so short-lived threads do not pile up shards.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._base = ({}, {})
+        self._lock = threading.Lock()
+        self._flushed = time.monotonic()
+
+    def _shard(self):
+        """Return the counters written by the current thread"""
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})
+            with self._lock:
+                self._shards.append(shard)
+            weakref.finalize(threading.current_thread(), self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        """Fold the shard of a finished thread into the base totals"""
+        with self._lock:
+            self._shards = [other for other in self._shards
+                            if other is not shard]
+            _add_shard(self._base, shard)
+
+    def inc(self, name, labels, value=1):
+        """Add to a counter"""
+        counters = self._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        """Record a value in a histogram"""
+        histograms = self._shard()[1]
+        key = (name, labels)
+        buckets = get_config()['BUCKETS']
+        histogram = histograms.get(key)
+        if histogram is None:
+            # One slot per bucket plus +Inf, then the sum of the values
+            histogram = histograms[key] = [0] * (len(buckets) + 2)
+        histogram[bisect.bisect_left(buckets, value)] += 1
+        histogram[-1] += value
+
+    def snapshot(self):
+        """Return the merged values of every thread, JSON serializable"""
+        counters, histograms = {}, {}
+        with self._lock:
+            # Copied with the list so a shard retired meanwhile is not
+            # counted twice
+            _add_shard((counters, histograms), self._base)
+            shards = list(self._shards)
+        for shard in shards:
+            _add_shard((counters, histograms), shard)
+        return {
+            'counters': [
+                [name, list(labels), value]
+                for (name, labels), value in counters.items()
+            ],
+            'histograms': [
+                [name, list(labels), value]
+                for (name, labels), value in histograms.items()
+            ],
+            'gauges': [
+                ['db_pool_connections', [['alias', alias], ['state', state]],
+                 stats[state]]
+                for alias, stats in pool.stats().items()
+                for state in ('idle', 'in_use')
+            ],
+        }
+
+    def clear(self):
+        """Reset every counter, for tests"""
+        with self._lock:
+            for counters, histograms in [self._base, *self._shards]:
+                counters.clear()
+                histograms.clear()
+
+    def flush(self, force=False):
+        """Write this process's snapshot to the shared metrics directory"""
+        config = get_config()
+        directory = config['DIR']
+        now = time.monotonic()
+        if not directory or (
+            not force and now - self._flushed < config['FLUSH_INTERVAL']
+        ):
+            return
+        self._flushed = now
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+
+registry = Registry()
+
+
+def _is_running(pid):
+    """Return whether a process with the pid exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(total, snapshot, gauges=True):
+    """Add a snapshot into the running totals"""
+    if gauges:
+        for name, labels, value in snapshot.get('gauges', []):
+            key = (name, tuple(map(tuple, labels)))
+            total['gauges'][key] = total['gauges'].get(key, 0) + value
+    for name, labels, value in snapshot['counters']:
+        key = (name, tuple(map(tuple, labels)))
+        total['counters'][key] = total['counters'].get(key, 0) + value
+    for name, labels, value in snapshot['histograms']:
+        key = (name, tuple(map(tuple, labels)))
+        merged = total['histograms'].setdefault(key, [0] * len(value))
+        for index, count in enumerate(value):
+            merged[index] += count
+
+
+def collect():
+    """Return the totals of this process and every other flushed one"""
+    total = {'counters': {}, 'histograms': {}, 'gauges': {}}
+    _merge(total, registry.snapshot())
+    directory = get_config()['DIR']
+    if directory:
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            pid = os.path.splitext(os.path.basename(path))[0]
+            if not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            # Counters of exited workers are kept, their gauges are stale
+            _merge(total, snapshot, gauges=_is_running(int(pid)))
+    return total
+
+
+def _format_labels(labels):
+    """Return labels as {name="value",...}"""
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'),
+        )
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def _format_number(value):
+    """Return a number in the exposition format"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def render():
+    """Return every metric in the Prometheus text exposition format"""
+    total = collect()
+    series = {}
+    for (name, labels), value in sorted(total['counters'].items()):
+        series.setdefault(name, []).append(
+            f'{name}{_format_labels(labels)} {_format_number(value)}')
+    buckets = get_config()['BUCKETS']
+    for (name, labels), value in sorted(total['histograms'].items()):
+        lines = series.setdefault(name, [])
+        cumulative = 0
+        bounds = [str(bound) for bound in buckets] + ['+Inf']
+        for bound, count in zip(bounds, value[:-1]):
+            cumulative += count
+            bucket_labels = _format_labels(labels + (('le', bound),))
+            lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+        lines.append(
+            f'{name}_sum{_format_labels(labels)} '
+            f'{_format_number(round(value[-1], 6))}')
+        lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    for (name, labels), value in sorted(total['gauges'].items()):
+        series.setdefault(name, []).append(
+            f'{name}{_format_labels(labels)} {_format_number(value)}')
+
+    output = []
+    for name in sorted(series):
+        kind, description = HELP.get(name, ('untyped', name))
+        output.append(f'# HELP {name} {description}')
+        output.append(f'# TYPE {name} {kind}')
+        output.extend(series[name])
+    return '\n'.join(output) + '\n'
@@ -0,0 +1,218 @@
+"""
+Middleware of the core app
+"""
+import asyncio
+import time
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.deprecation import MiddlewareMixin
+from core import compression, metrics, timing
+from core.db import tracing
+
+
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class BaseMiddleware(MiddlewareMixin):
+    """Middleware running in the mode of the handler it wraps
+
+    Subclasses implement handle() for WSGI and __acall__() for ASGI, so the
+    ASGI handler is not adapted to sync around them and serialized on the
+    thread shared by sync code.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Record latency, status and SQL usage per resolved view name"""
+
+    def __init__(self, get_response):
+        if not metrics.get_config()['ENABLED']:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        queries = [0, 0.0]
+        start = time.perf_counter()
+        with tracing.recording(self._counter(queries)):
+            response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = [0, 0.0]
+        start = time.perf_counter()
+        with tracing.recording(self._counter(queries)):
+            response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    def _counter(self, queries):
+        """Return a recorder adding to the query count and time"""
+        def record(sql, seconds):
+            queries[0] += 1
+            queries[1] += seconds
+        return record
+
+    def _record(self, request, response, elapsed, queries):
+        """Add the request to the metrics of its view"""
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        method = request.method if request.method in METHODS else 'other'
+        labels = (('view', view), ('method', method))
+        registry = metrics.registry
+        registry.inc(
+            'http_requests_total',
+            labels + (('status', str(response.status_code)),),
+        )
+        registry.observe('http_request_duration_seconds', labels, elapsed)
+        registry.inc('http_request_sql_queries_total', labels, queries[0])
+        registry.inc(
+            'http_request_sql_duration_seconds_total', labels, queries[1])
+        registry.flush()
+
+
+def _timing_entry(name, seconds, description=None):
+    """Return a Server-Timing metric with the duration in milliseconds"""
+    entry = f'{name};dur={seconds * 1000:.2f}'
+    if description:
+        escaped = description.replace('\\', '\\\\').replace('"', '\\"')
+        entry += f';desc="{escaped}"'
+    return entry
+
+
+class ServerTimingMiddleware(BaseMiddleware):
+    """Report auth, db, serialization and render time on request"""
+
+    def __init__(self, get_response):
+        config = timing.get_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.meta_key = 'HTTP_' + config['HEADER'].upper().replace('-', '_')
+
+    def _options(self, request):
+        """Return the flags sent in the opt-in header, or None"""
+        value = request.META.get(self.meta_key)
+        if value is None:
+            return None
+        return {flag.strip() for flag in value.split(',')}
+
+    def _allowed(self, request, options):
+        """Return whether the caller may see the timings"""
+        token = timing.get_config()['TOKEN']
+        if token and token in options:
+            return True
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_staff)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Mark the start of the view"""
+        state = timing.current.get()
+        if state is not None:
+            state.view_start = time.perf_counter()
+            state.db_at_view_start = state.db
+
+    def process_template_response(self, request, response):
+        """Mark the end of the view and time the rendering"""
+        state = timing.current.get()
+        if state is None or state.view_start is None:
+            return response
+        state.add('view', time.perf_counter() - state.view_start)
+        state.db_in_view = state.db - state.db_at_view_start
+        render_start = time.perf_counter()
+
+        def rendered(response):
+            state.add('render', time.perf_counter() - render_start)
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def _header(self, state, total):
+        """Return the Server-Timing header value"""
+        phases = state.phases
+        auth = phases.get('auth', 0.0)
+        db_in_auth = state.db_by_phase.get('auth', 0.0)
+        entries = [_timing_entry('auth', auth)] if 'auth' in phases else []
+        entries.append(_timing_entry(
+            'db', state.db, f'{state.query_count} queries'))
+        if 'view' in phases:
+            # Time in the view that was spent neither authenticating nor
+            # waiting on SQL, i.e. building and serializing the payload
+            serialize = (
+                phases['view'] - auth - (state.db_in_view - db_in_auth))
+            entries.append(_timing_entry('serialize', max(serialize, 0.0)))
+        if 'render' in phases:
+            entries.append(_timing_entry('render', phases['render']))
+        entries.append(_timing_entry('total', total))
+
+        length = timing.get_config()['SQL_LENGTH']
+        for index, (sql, seconds) in enumerate(state.queries, start=1):
+            entries.append(_timing_entry(
+                f'sql-{index}', seconds, sql[:length]))
+        return ', '.join(entries)
+
+    def _timing(self, options):
+        """Return the timings of a request sending the given flags"""
+        return timing.Timing(
+            trace_sql='sql' in options,
+            max_sql=timing.get_config()['MAX_SQL'],
+        )
+
+    def _finish(self, request, response, options, state, total):
+        """Add the Server-Timing header if the caller may see it"""
+        if self._allowed(request, options):
+            response['Server-Timing'] = self._header(state, total)
+        return response
+
+    def handle(self, request):
+        options = self._options(request)
+        if options is None:
+            return self.get_response(request)
+
+        state = self._timing(options)
+        token = timing.current.set(state)
+        start = time.perf_counter()
+        try:
+            with tracing.recording(state.record_sql):
+                response = self.get_response(request)
+        finally:
+            timing.current.reset(token)
+        return self._finish(
+            request, response, options, state, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        options = self._options(request)
+        if options is None:
+            return await self.get_response(request)
+
+        state = self._timing(options)
+        token = timing.current.set(state)
+        start = time.perf_counter()
+        try:
+            with tracing.recording(state.record_sql):
+                response = await self.get_response(request)
+        finally:
+            timing.current.reset(token)
+        return self._finish(
+            request, response, options, state, time.perf_counter() - start)
+
+
+class CompressionMiddleware(BaseMiddleware):
+    """Compress responses with brotli or gzip, see core/compression.py"""
+
+    def __init__(self, get_response):
+        if not compression.get_config()['ENABLED']:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        response = self.get_response(request)
+        return compression.compress_response(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return compression.compress_response(request, response)
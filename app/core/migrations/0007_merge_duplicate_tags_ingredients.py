@@ -0,0 +1,45 @@
+# Generated by Django 3.2.20 on 2026-10-18 09:12
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Merge duplicate tags and ingredients before adding the constraint"""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field_name).through
+        column = f'{model_name.lower()}_id'
+        duplicates = (
+            model.objects.values('user_id', 'name')
+            .annotate(keep_id=Min('id'), total=Count('id'))
+            .filter(total__gt=1)
+        )
+        for duplicate in duplicates:
+            keep_id = duplicate['keep_id']
+            others = model.objects.filter(
+                user_id=duplicate['user_id'],
+                name=duplicate['name'],
+            ).exclude(id=keep_id)
+            recipe_ids = set(
+                through.objects.filter(**{f'{column}__in': others})
+                .values_list('recipe_id', flat=True)
+            )
+            through.objects.bulk_create(
+                [through(recipe_id=recipe_id, **{column: keep_id})
+                 for recipe_id in recipe_ids],
+                ignore_conflicts=True,
+            )
+            others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,145 @@
+# Generated by Django 3.2.20 on 2026-10-18 13:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+SEARCH_SQL = """
+CREATE OR REPLACE FUNCTION core_recipe_search_vector(
+    r_id bigint, r_title text, r_description text
+) RETURNS tsvector AS $$
+    SELECT
+        setweight(to_tsvector('english', coalesce(r_title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(t.name, ' ')
+            FROM core_tag t
+            JOIN core_recipe_tags rt ON rt.tag_id = t.id
+            WHERE rt.recipe_id = r_id
+        ), '')), 'B')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(i.name, ' ')
+            FROM core_ingredient i
+            JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+            WHERE ri.recipe_id = r_id
+        ), '')), 'B')
+        || setweight(to_tsvector('english', coalesce(r_description, '')), 'C')
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION core_recipe_search_row() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := core_recipe_search_vector(
+        NEW.id, NEW.title, NEW.description);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_recipe_search_links() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE core_recipe r
+        SET search_vector = core_recipe_search_vector(r.id, r.title, r.description)
+        WHERE r.id IN (SELECT recipe_id FROM new_links);
+    ELSE
+        UPDATE core_recipe r
+        SET search_vector = core_recipe_search_vector(r.id, r.title, r.description)
+        WHERE r.id IN (SELECT recipe_id FROM old_links);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_recipe_search_tag_name() RETURNS trigger AS $$
+BEGIN
+    UPDATE core_recipe r
+    SET search_vector = core_recipe_search_vector(r.id, r.title, r.description)
+    WHERE r.id IN (
+        SELECT recipe_id FROM core_recipe_tags WHERE tag_id = NEW.id
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_recipe_search_ingredient_name() RETURNS trigger AS $$
+BEGIN
+    UPDATE core_recipe r
+    SET search_vector = core_recipe_search_vector(r.id, r.title, r.description)
+    WHERE r.id IN (
+        SELECT recipe_id FROM core_recipe_ingredients WHERE ingredient_id = NEW.id
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_search_row
+    BEFORE INSERT OR UPDATE OF title, description ON core_recipe
+    FOR EACH ROW EXECUTE PROCEDURE core_recipe_search_row();
+
+CREATE TRIGGER core_recipe_tags_search_insert
+    AFTER INSERT ON core_recipe_tags
+    REFERENCING NEW TABLE AS new_links
+    FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_search_links();
+
+CREATE TRIGGER core_recipe_tags_search_delete
+    AFTER DELETE ON core_recipe_tags
+    REFERENCING OLD TABLE AS old_links
+    FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_search_links();
+
+CREATE TRIGGER core_recipe_ingredients_search_insert
+    AFTER INSERT ON core_recipe_ingredients
+    REFERENCING NEW TABLE AS new_links
+    FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_search_links();
+
+CREATE TRIGGER core_recipe_ingredients_search_delete
+    AFTER DELETE ON core_recipe_ingredients
+    REFERENCING OLD TABLE AS old_links
+    FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_search_links();
+
+CREATE TRIGGER core_tag_search_name
+    AFTER UPDATE OF name ON core_tag
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE PROCEDURE core_recipe_search_tag_name();
+
+CREATE TRIGGER core_ingredient_search_name
+    AFTER UPDATE OF name ON core_ingredient
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE PROCEDURE core_recipe_search_ingredient_name();
+
+UPDATE core_recipe
+SET search_vector = core_recipe_search_vector(id, title, description);
+"""
+
+REVERSE_SQL = """
+DROP TRIGGER IF EXISTS core_ingredient_search_name ON core_ingredient;
+DROP TRIGGER IF EXISTS core_tag_search_name ON core_tag;
+DROP TRIGGER IF EXISTS core_recipe_ingredients_search_delete ON core_recipe_ingredients;
+DROP TRIGGER IF EXISTS core_recipe_ingredients_search_insert ON core_recipe_ingredients;
+DROP TRIGGER IF EXISTS core_recipe_tags_search_delete ON core_recipe_tags;
+DROP TRIGGER IF EXISTS core_recipe_tags_search_insert ON core_recipe_tags;
+DROP TRIGGER IF EXISTS core_recipe_search_row ON core_recipe;
+DROP FUNCTION IF EXISTS core_recipe_search_ingredient_name();
+DROP FUNCTION IF EXISTS core_recipe_search_tag_name();
+DROP FUNCTION IF EXISTS core_recipe_search_links();
+DROP FUNCTION IF EXISTS core_recipe_search_row();
+DROP FUNCTION IF EXISTS core_recipe_search_vector(bigint, text, text);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(SEARCH_SQL, REVERSE_SQL),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+    ]
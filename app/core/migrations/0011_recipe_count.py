@@ -0,0 +1,124 @@
+# Generated by Django 3.2.20 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+COUNT_SQL = """
+CREATE OR REPLACE FUNCTION core_tag_recipe_count() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM 1 FROM core_tag
+        WHERE id IN (SELECT tag_id FROM new_links)
+        ORDER BY id FOR UPDATE;
+        UPDATE core_tag t SET recipe_count = t.recipe_count + n.total
+        FROM (
+            SELECT tag_id, count(*) AS total FROM new_links GROUP BY tag_id
+        ) n
+        WHERE t.id = n.tag_id;
+    ELSE
+        PERFORM 1 FROM core_tag
+        WHERE id IN (SELECT tag_id FROM old_links)
+        ORDER BY id FOR UPDATE;
+        UPDATE core_tag t SET recipe_count = t.recipe_count - n.total
+        FROM (
+            SELECT tag_id, count(*) AS total FROM old_links GROUP BY tag_id
+        ) n
+        WHERE t.id = n.tag_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_ingredient_recipe_count() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM 1 FROM core_ingredient
+        WHERE id IN (SELECT ingredient_id FROM new_links)
+        ORDER BY id FOR UPDATE;
+        UPDATE core_ingredient i SET recipe_count = i.recipe_count + n.total
+        FROM (
+            SELECT ingredient_id, count(*) AS total
+            FROM new_links GROUP BY ingredient_id
+        ) n
+        WHERE i.id = n.ingredient_id;
+    ELSE
+        PERFORM 1 FROM core_ingredient
+        WHERE id IN (SELECT ingredient_id FROM old_links)
+        ORDER BY id FOR UPDATE;
+        UPDATE core_ingredient i SET recipe_count = i.recipe_count - n.total
+        FROM (
+            SELECT ingredient_id, count(*) AS total
+            FROM old_links GROUP BY ingredient_id
+        ) n
+        WHERE i.id = n.ingredient_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_tags_count_insert
+    AFTER INSERT ON core_recipe_tags
+    REFERENCING NEW TABLE AS new_links
+    FOR EACH STATEMENT EXECUTE PROCEDURE core_tag_recipe_count();
+
+CREATE TRIGGER core_recipe_tags_count_delete
+    AFTER DELETE ON core_recipe_tags
+    REFERENCING OLD TABLE AS old_links
+    FOR EACH STATEMENT EXECUTE PROCEDURE core_tag_recipe_count();
+
+CREATE TRIGGER core_recipe_ingredients_count_insert
+    AFTER INSERT ON core_recipe_ingredients
+    REFERENCING NEW TABLE AS new_links
+    FOR EACH STATEMENT EXECUTE PROCEDURE core_ingredient_recipe_count();
+
+CREATE TRIGGER core_recipe_ingredients_count_delete
+    AFTER DELETE ON core_recipe_ingredients
+    REFERENCING OLD TABLE AS old_links
+    FOR EACH STATEMENT EXECUTE PROCEDURE core_ingredient_recipe_count();
+
+UPDATE core_tag t SET recipe_count = (
+    SELECT count(*) FROM core_recipe_tags WHERE tag_id = t.id
+);
+
+UPDATE core_ingredient i SET recipe_count = (
+    SELECT count(*) FROM core_recipe_ingredients WHERE ingredient_id = i.id
+);
+"""
+
+REVERSE_SQL = """
+DROP TRIGGER IF EXISTS core_recipe_ingredients_count_delete ON core_recipe_ingredients;
+DROP TRIGGER IF EXISTS core_recipe_ingredients_count_insert ON core_recipe_ingredients;
+DROP TRIGGER IF EXISTS core_recipe_tags_count_delete ON core_recipe_tags;
+DROP TRIGGER IF EXISTS core_recipe_tags_count_insert ON core_recipe_tags;
+DROP FUNCTION IF EXISTS core_ingredient_recipe_count();
+DROP FUNCTION IF EXISTS core_tag_recipe_count();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(COUNT_SQL, REVERSE_SQL),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(condition=models.Q(('recipe_count__gt', 0)), fields=['user', 'name'], name='tag_user_name_assigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(condition=models.Q(('recipe_count__gt', 0)), fields=['user', 'name'], name='ingr_user_name_assigned_idx'),
+        ),
+    ]
@@ -1,12 +1,15 @@
 import uuid
 import os
 from django.db import models # noqa
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 from django.conf import settings
+from django.utils import timezone
 
 
 def recipe_image_file_path(instance, filepath):
@@ -16,6 +19,22 @@ def recipe_image_file_path(instance, filepath):
     return os.path.join('uploads', 'recipe', filename)
 
 
+class DatabaseMaintainedMixin:
+    """Never write fields maintained by database triggers on update"""
+    db_maintained_fields = ()
+
+    def save(self, *args, **kwargs):
+        """Save every field except the database maintained ones"""
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = set(self.db_maintained_fields)
+            skipped.update(self.get_deferred_fields())
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
 # Create your models here.
 class UserManager(BaseUserManager):
     """Manager for user profiles"""
@@ -54,7 +73,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     objects = UserManager()
 
 
-class Recipe(models.Model):
+class Recipe(DatabaseMaintainedMixin, models.Model):
     """Recipe object"""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -68,30 +87,144 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Maintained by database triggers from the title, description and the
+    # names of the linked tags and ingredients, see migration 0010.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Storage names of the resized image variants, written by the image
+    # workers in recipe.images once they have been generated.
+    image_variants = models.JSONField(default=dict, editable=False)
+
+    db_maintained_fields = ('search_vector', 'image_variants')
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='recipe_user_id_desc_idx',
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 
-class Tag(models.Model):
+class Tag(DatabaseMaintainedMixin, models.Model):
     """Tag for filtering recipes"""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
     name = models.CharField(max_length=255)
+    # Maintained by database triggers on the recipe link table
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    db_maintained_fields = ('recipe_count',)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_tag_user_name',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'name'],
+                condition=models.Q(recipe_count__gt=0),
+                name='tag_user_name_assigned_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Ingredient(models.Model):
+class Ingredient(DatabaseMaintainedMixin, models.Model):
     """Ingredient to be used in recipe"""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
     name = models.CharField(max_length=255)
+    # Maintained by database triggers on the recipe link table
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    db_maintained_fields = ('recipe_count',)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_ingredient_user_name',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'name'],
+                condition=models.Q(recipe_count__gt=0),
+                name='ingr_user_name_assigned_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class Job(models.Model):
+    """Background job run by the run_worker command"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        on_delete=models.CASCADE,
+    )
+    task = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['run_at', 'id'],
+                condition=models.Q(status='queued'),
+                name='job_queued_run_at_idx',
+            ),
+            models.Index(
+                fields=['locked_at'],
+                condition=models.Q(status='running'),
+                name='job_running_locked_at_idx',
+            ),
+            models.Index(
+                fields=['user', '-id'],
+                name='job_user_id_desc_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.id} ({self.status})'
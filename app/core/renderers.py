@@ -0,0 +1,39 @@
+"""
+JSON renderer backed by orjson when it is installed
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Render the same bytes as JSONRenderer, encoding with orjson
+
+    Dates and times, decimals and anything else orjson does not support
+    natively go through the DRF encoder. Floats are written by orjson, so
+    this is meant for payloads of serializer output, which has none.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into compact UTF-8 JSON"""
+        if orjson is None or data is None or not self.compact \
+                or self.ensure_ascii or self.get_indent(
+                    accepted_media_type, renderer_context or {}):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except (orjson.JSONEncodeError, ValueError):
+            # e.g. non-string keys, which the json module converts
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        # Escaped by JSONRenderer for use in javascript, see its render()
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029')
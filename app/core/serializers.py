@@ -0,0 +1,26 @@
+"""
+Serializers for the core api
+"""
+from rest_framework import serializers
+from core.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for the status of background jobs"""
+    last_error = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'task', 'status', 'attempts', 'max_attempts', 'run_at',
+            'last_error', 'created_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+    def get_last_error(self, obj) -> str:
+        """Return the exception of the last failure, without the traceback
+
+        The traceback is logged by the worker and kept for the admin.
+        """
+        lines = obj.last_error.strip().splitlines()
+        return lines[-1] if lines else ''
@@ -0,0 +1,136 @@
+"""Tests for serving requests through the ASGI handler"""
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import path, reverse
+from rest_framework.authtoken.models import Token
+
+from core import metrics
+from core.authentication import token_cache
+from core.models import Tag
+
+
+async def sleep_view(request):
+    """Wait without holding a thread"""
+    await asyncio.sleep(0.3)
+    return HttpResponse('ok' * 1024)
+
+
+urlpatterns = [path('sleep/', sleep_view)]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsgiConcurrencyTests(SimpleTestCase):
+    """Test the middleware keeps async views concurrent under ASGI"""
+    middleware = settings.MIDDLEWARE
+    # Opt in to every middleware so that none of them is passed through
+    headers = {'x-server-timing': '1', 'accept-encoding': 'gzip'}
+
+    def test_async_views_overlap(self):
+        """Test concurrent requests to an async view are not serialized"""
+        async def fetch_all():
+            client = AsyncClient()
+            return await asyncio.gather(
+                *(client.get('/sleep/', **self.headers) for _ in range(4)))
+
+        with override_settings(MIDDLEWARE=self.middleware):
+            start = time.perf_counter()
+            responses = async_to_sync(fetch_all)()
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual([res.status_code for res in responses], [200] * 4)
+        self.assertEqual(
+            [res['Content-Encoding'] for res in responses], ['gzip'] * 4)
+        self.assertLess(elapsed, 0.9)
+
+
+@override_settings(METRICS={'TOKEN': 'secret'})
+class AsgiMetricsTests(TransactionTestCase):
+    """Test the metrics of requests served by the ASGI handler"""
+
+    def setUp(self):
+        metrics.registry.clear()
+        token_cache.clear()
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            username='user',
+            password='testpass123',
+        )
+        self.token = Token.objects.create(user=user)
+        Tag.objects.create(user=user, name='Vegan')
+
+    def tearDown(self):
+        metrics.registry.clear()
+        token_cache.clear()
+
+    def test_counts_queries_of_executor_threads(self):
+        """Test queries run off the event loop are counted for the view"""
+        async def fetch():
+            # The async client of Django 3.2 sends extra arguments as raw
+            # header names rather than HTTP_* keys
+            return await AsyncClient().get(
+                reverse('recipe-async:tag-list'),
+                authorization=f'Token {self.token.key}',
+            )
+
+        # Warm the token cache so that only the view queries are counted
+        async_to_sync(fetch)()
+        metrics.registry.clear()
+        res = async_to_sync(fetch)()
+        body = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret',
+        ).content.decode()
+
+        self.assertEqual(res.status_code, 200)
+        queries = [
+            line for line in body.splitlines()
+            if line.startswith(
+                'http_request_sql_queries_total{view="recipe-async:tag-list"')
+        ]
+        self.assertTrue(queries)
+        self.assertGreater(int(queries[0].rsplit(' ', 1)[1]), 0)
+
+
+@override_settings(SERVER_TIMING={'TOKEN': 'let-me-see'})
+class AsgiServerTimingTests(TransactionTestCase):
+    """Test the Server-Timing header of requests served by ASGI"""
+
+    def setUp(self):
+        token_cache.clear()
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            username='user',
+            password='testpass123',
+        )
+        self.token = Token.objects.create(user=user)
+        Tag.objects.create(user=user, name='Vegan')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_times_queries_of_executor_threads(self):
+        """Test the queries of async views are listed in the header"""
+        async def fetch():
+            return await AsyncClient().get(
+                reverse('recipe-async:tag-list'),
+                authorization=f'Token {self.token.key}',
+                **{'x-server-timing': 'let-me-see,sql'},
+            )
+
+        res = async_to_sync(fetch)()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertRegex(
+            res['Server-Timing'],
+            r'sql-\d+;dur=[\d.]+;desc="SELECT .*core_tag',
+        )
@@ -0,0 +1,125 @@
+"""Tests for cached token authentication"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    AsyncCachedTokenAuthentication,
+    token_cache,
+)
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the cached token authentication class"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            username='user',
+            password='testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_cached_token_skips_database(self):
+        """Test a cached token authenticates without a query"""
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_invalidated(self):
+        """Test a deleted token stops authenticating"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        """Test a deactivated user stops authenticating"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_update_invalidated(self):
+        """Test updating the user refreshes the cached user"""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'New name'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New name')
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 1})
+    def test_cache_bounded(self):
+        """Test the in-process cache evicts the least recently used"""
+        token_cache.set('first', self.user)
+        token_cache.set('second', self.user)
+
+        self.assertIsNone(token_cache.get('first'))
+        self.assertEqual(token_cache.get('second'), self.user)
+
+    def test_hits_return_separate_users(self):
+        """Test every hit gets its own user instance"""
+        token_cache.set(self.token.key, self.user)
+
+        first = token_cache.get(self.token.key)
+        first.name = 'Changed by one request'
+        second = token_cache.get(self.token.key)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.name, self.user.name)
+
+    @override_settings(TOKEN_AUTH_CACHE={'SHARED_CACHE': 'default'})
+    def test_password_not_cached(self):
+        """Test the cached entries hold no password hash"""
+        cache.clear()
+        token_cache.set(self.token.key, self.user)
+        token_cache.clear()
+
+        entry = cache.get(token_cache._shared_key(self.token.key))
+        user = token_cache.get(self.token.key)
+
+        self.assertNotIn('password', entry)
+        self.assertEqual(entry['email'], self.user.email)
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('testpass123'))
+
+    def test_inactive_entry_not_served(self):
+        """Test a cached inactive user is looked up again"""
+        self.user.is_active = False
+        token_cache.set(self.token.key, self.user)
+
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertIsNone(token_cache.get_local(self.token.key))
+
+    def test_async_key_parsing(self):
+        """Test the async class parses the header like TokenAuthentication"""
+        request = self.client.get(ME_URL).wsgi_request
+        auth = AsyncCachedTokenAuthentication()
+
+        self.assertEqual(auth.get_key(request), self.token.key)
+        request.META['HTTP_AUTHORIZATION'] = 'Bearer abc'
+        self.assertIsNone(auth.get_key(request))
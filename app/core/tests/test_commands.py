@@ -1,10 +1,20 @@
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase
+
+from core.benchmark import percentile
+from core.models import Ingredient, Recipe, Tag
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -24,3 +34,249 @@ class CommandTests(SimpleTestCase):
         call_command('wait_for_db')
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+    @patch('time.sleep')
+    def test_wait_for_db_backoff(self, patched_sleep, patched_check):
+        """Test the delay doubles from a short start up to the cap"""
+        patched_check.side_effect = [OperationalError] * 6 + [True]
+
+        call_command('wait_for_db', initial_delay=0.1, max_delay=1,
+                     stdout=io.StringIO())
+
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertEqual(delays, [0.1, 0.2, 0.4, 0.8, 1, 1])
+
+    @patch('time.sleep')
+    @patch('time.monotonic')
+    def test_wait_for_db_timeout(self, patched_monotonic, patched_sleep,
+                                 patched_check):
+        """Test the command gives up after the timeout"""
+        patched_check.side_effect = OperationalError
+        patched_monotonic.side_effect = [0, 1, 3, 6]
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=5, stdout=io.StringIO())
+
+        self.assertEqual(patched_check.call_count, 3)
+
+
+class ImportRecipesTests(TestCase):
+    """Test the import_recipes command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            username='user',
+            password='testpass123',
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, name, content):
+        """Write an import file and return its path"""
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_import_ndjson(self):
+        """Test importing recipes with tags and ingredients from NDJSON"""
+        Tag.objects.create(user=self.user, name='Thai')
+        rows = [
+            {'title': 'Curry', 'price': '4.50', 'time_minutes': 20,
+             'tags': ['Thai', 'Spicy'], 'ingredients': [{'name': 'Rice'}]},
+            {'title': 'Soup', 'price': '2.00', 'time_minutes': 10,
+             'tags': ['Thai']},
+        ]
+        path = self._write(
+            'recipes.ndjson', '\n'.join(json.dumps(row) for row in rows))
+
+        call_command('import_recipes', path, user=self.user.email,
+                     stdout=io.StringIO())
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual([r.title for r in recipes], ['Curry', 'Soup'])
+        self.assertEqual(recipes[0].price, Decimal('4.50'))
+        self.assertEqual(
+            sorted(tag.name for tag in recipes[0].tags.all()),
+            ['Spicy', 'Thai'],
+        )
+        self.assertEqual(recipes[0].ingredients.get().name, 'Rice')
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_csv(self):
+        """Test importing recipes from CSV"""
+        path = self._write(
+            'recipes.csv',
+            'title,description,price,time_minutes,link,tags,ingredients\n'
+            'Toast,,1.25,5,,Breakfast,Bread|Butter\n',
+        )
+
+        call_command('import_recipes', path, user=self.user.email,
+                     stdout=io.StringIO())
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, 'Toast')
+        self.assertEqual(recipe.description, '')
+        self.assertEqual(
+            sorted(i.name for i in recipe.ingredients.all()),
+            ['Bread', 'Butter'],
+        )
+
+    def test_import_invalid_row_rolls_back(self):
+        """Test an invalid row aborts the import"""
+        path = self._write(
+            'recipes.ndjson',
+            '{"title": "Curry", "price": "4.50", "time_minutes": 20}\n'
+            '{"title": "Soup", "price": "free", "time_minutes": 10}\n',
+        )
+
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', path, user=self.user.email,
+                         batch_size=1, stdout=io.StringIO())
+
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+
+class BenchmarkIndexesTests(TestCase):
+    """Test the benchmark_indexes command"""
+
+    def test_benchmark_reports_and_rolls_back(self):
+        """Test the benchmark prints plans and discards its data"""
+        out = io.StringIO()
+
+        call_command('benchmark_indexes', users=2, recipes=20, tags=5,
+                     stdout=out)
+
+        self.assertIn('recipe list', out.getvalue())
+        self.assertIn('Summary', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class BenchmarkFiltersTests(TestCase):
+    """Test the benchmark_filters command"""
+
+    def test_benchmark_reports_and_rolls_back(self):
+        """Test the benchmark compares both filter styles"""
+        out = io.StringIO()
+
+        call_command('benchmark_filters', users=2, recipes=20, tags=10,
+                     stdout=out)
+
+        self.assertIn('EXISTS', out.getvalue())
+        self.assertIn('all tags', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+
+class BenchmarkApiTests(TestCase):
+    """Test the benchmark_api command"""
+
+    def test_benchmark_writes_report_and_rolls_back(self):
+        """Test every scenario is measured and the data discarded"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            call_command('benchmark_api', users=2, recipes=5, tags=4,
+                         ingredients=4, tag_every=2, ingredient_every=2,
+                         iterations=2, warmup=0, output=path,
+                         stdout=io.StringIO())
+            with open(path) as f:
+                report = json.load(f)
+            out = io.StringIO()
+            call_command('benchmark_api', users=2, recipes=5,
+                         iterations=2, warmup=0, scenario=['recipe list'],
+                         compare=path, stdout=out)
+
+        scenarios = report['scenarios']
+        self.assertEqual(scenarios['recipe list']['statuses'], [200])
+        self.assertEqual(
+            scenarios['recipe create with tags']['statuses'], [201])
+        self.assertEqual(scenarios['token login']['statuses'], [200])
+        self.assertEqual(scenarios['image upload']['statuses'], [200])
+        self.assertEqual(scenarios['recipe list by tags']['requests'], 2)
+        self.assertGreater(scenarios['recipe list']['queries'], 0)
+        self.assertIn('recipe list: throughput', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_unknown_scenario(self):
+        """Test naming a scenario that does not exist fails"""
+        with self.assertRaises(CommandError):
+            call_command('benchmark_api', users=1, recipes=1,
+                         scenario=['nope'], stdout=io.StringIO())
+
+
+class SeedDataTests(TestCase):
+    """Test the seed_data command"""
+
+    def _seed(self, prefix, seed=1):
+        """Seed a small dataset"""
+        call_command('seed_data', users=3, recipes=4, tags=5, ingredients=6,
+                     seed=seed, prefix=prefix, batch_size=2,
+                     stdout=io.StringIO())
+        return [
+            (recipe.title, sorted(tag.name for tag in recipe.tags.all()))
+            for recipe in Recipe.objects.filter(
+                user__username__startswith=prefix,
+            ).order_by('id').prefetch_related('tags')
+        ]
+
+    def test_seed_data(self):
+        """Test the generated rows, counts and logins"""
+        self._seed('a')
+
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Recipe.objects.count(), 12)
+        self.assertEqual(Tag.objects.count(), 15)
+        self.assertEqual(Ingredient.objects.count(), 18)
+        user = get_user_model().objects.get(email='a2@example.com')
+        self.assertTrue(user.check_password('password123'))
+        for tag in Tag.objects.all():
+            self.assertEqual(tag.recipe_count, tag.recipe_set.count())
+        recipe = Recipe.objects.filter(tags__isnull=False).first()
+        self.assertTrue(Recipe.objects.filter(
+            id=recipe.id, search_vector=recipe.tags.first().name).exists())
+
+    def test_seed_data_is_deterministic(self):
+        """Test the same seed generates the same recipes"""
+        first = self._seed('a')
+        second = self._seed('b')
+        other = self._seed('c', seed=2)
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_existing_prefix_rejected(self):
+        """Test seeding twice with the same prefix fails"""
+        self._seed('a')
+
+        with self.assertRaises(CommandError):
+            self._seed('a')
+
+
+class LoadTestTests(LiveServerTestCase):
+    """Test the load_test command"""
+
+    def test_percentile(self):
+        """Test the nearest-rank percentile"""
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.99), 7)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_load_test_reports_latency(self):
+        """Test the command reports latency and status counts per url"""
+        url = f'{self.live_server_url}/api/recipe/tags/'
+        out = io.StringIO()
+
+        call_command('load_test', url, requests=10, concurrency=2,
+                     json=True, stdout=out)
+
+        report = json.loads(out.getvalue())[url]
+        self.assertEqual(report['requests'], 10)
+        self.assertEqual(report['statuses'], {'401': 10})
+        self.assertLessEqual(report['p50_ms'], report['p99_ms'])
@@ -0,0 +1,121 @@
+"""Tests for the response compression middleware"""
+import gzip
+import json
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.client import RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import compression
+from core.models import Recipe, Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class NegotiationTests(SimpleTestCase):
+    """Test the choice of encoding from Accept-Encoding"""
+
+    def _negotiate(self, accept_encoding):
+        """Return the negotiated encoding of a request with the header"""
+        request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return compression.negotiate(request)
+
+    def test_gzip(self):
+        """Test gzip is chosen unless refused"""
+        self.assertEqual(self._negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(self._negotiate('GZIP;q=0.5'), 'gzip')
+        self.assertIsNone(self._negotiate('gzip;q=0'))
+        self.assertIsNone(self._negotiate('deflate, identity'))
+        self.assertIsNone(self._negotiate(''))
+
+    @skipIf(compression.brotli is None, 'Brotli is not installed')
+    def test_brotli_preferred(self):
+        """Test brotli wins ties and loses to a higher gzip quality"""
+        self.assertEqual(self._negotiate('gzip, br'), 'br')
+        self.assertEqual(self._negotiate('*'), 'br')
+        self.assertEqual(self._negotiate('br;q=0.5, gzip'), 'gzip')
+
+    @override_settings(RESPONSE_COMPRESSION={'ENABLED': False})
+    def test_disabled(self):
+        """Test nothing is negotiated when compression is off"""
+        self.assertIsNone(self._negotiate('gzip'))
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class CompressionMiddlewareTests(TestCase):
+    """Test responses are compressed for clients that accept it"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            username='user',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _create_tags(self, count):
+        """Create count tags with distinct names"""
+        Tag.objects.bulk_create(
+            Tag(user=self.user, name=f'Tag number {i}', recipe_count=0)
+            for i in range(count)
+        )
+
+    def test_large_response_gzipped(self):
+        """Test a list above the threshold is sent gzipped"""
+        self._create_tags(40)
+
+        plain = self.client.get(TAGS_URL)
+        res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertEqual(int(res['Content-Length']), len(res.content))
+        self.assertLess(len(res.content), len(plain.content))
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+
+    def test_small_response_not_compressed(self):
+        """Test responses below MIN_SIZE are sent as they are"""
+        self._create_tags(1)
+
+        res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertNotIn('Content-Encoding', res)
+        self.assertEqual(len(res.json()['results']), 1)
+
+    def test_export_streamed_compressed(self):
+        """Test streaming exports are compressed incrementally"""
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, title=f'Recipe {i}', time_minutes=i,
+                   price='5.00', image_variants={})
+            for i in range(5)
+        )
+
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', res)
+        lines = gzip.decompress(
+            b''.join(res.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['title'], 'Recipe 4')
+
+    @skipIf(compression.brotli is None, 'Brotli is not installed')
+    def test_large_response_brotli(self):
+        """Test clients accepting brotli get brotli"""
+        self._create_tags(40)
+
+        plain = self.client.get(TAGS_URL)
+        res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(
+            compression.brotli.decompress(res.content), plain.content)
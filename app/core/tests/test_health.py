@@ -0,0 +1,71 @@
+"""Tests for the health endpoints"""
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from core.health import readiness
+
+
+LIVE_URL = reverse('health-live')
+READY_URL = reverse('health-ready')
+
+
+@override_settings(HEALTH_CHECKS={'CACHE_TTL': 60})
+class HealthTests(TestCase):
+    """Test the liveness and readiness endpoints"""
+
+    def setUp(self):
+        readiness.clear()
+
+    def tearDown(self):
+        readiness.clear()
+
+    def test_live(self):
+        """Test liveness does not query the database"""
+        with self.assertNumQueries(0):
+            res = self.client.get(LIVE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    def test_ready(self):
+        """Test readiness reports the database and migrations"""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {
+            'status': 'ok',
+            'checks': {'database': 'ok', 'migrations': 'ok'},
+        })
+
+    def test_ready_is_cached(self):
+        """Test repeated probes reuse the cached result"""
+        self.client.get(READY_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @patch('core.health.check_database', return_value='connection refused')
+    def test_not_ready_without_database(self, patched_check):
+        """Test readiness fails while the database is unreachable"""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()['checks'], {
+            'database': 'connection refused',
+            'migrations': 'skipped',
+        })
+
+    @patch('core.health.check_migrations',
+           return_value='2 unapplied migrations')
+    def test_not_ready_with_pending_migrations(self, patched_check):
+        """Test readiness fails until migrations are applied"""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(
+            res.json()['checks']['migrations'], '2 unapplied migrations')
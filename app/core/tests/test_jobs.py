@@ -0,0 +1,197 @@
+"""Tests for the database backed job queue"""
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Job
+
+
+JOBS_URL = reverse('core:job-list')
+
+CALLS = []
+
+
+def record(value):
+    """Task recording its argument"""
+    CALLS.append(value)
+
+
+def explode():
+    """Task that always fails"""
+    raise RuntimeError('boom')
+
+
+def create_user(email='user@example.com', username='user'):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='testpass123',
+    )
+
+
+@override_settings(JOBS={'BACKOFF': 10, 'MAX_BACKOFF': 15})
+class JobQueueTests(TestCase):
+    """Test enqueueing, claiming and running jobs"""
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueue_stores_task_path(self):
+        """Test a task function is stored by its import path"""
+        job = jobs.enqueue(record, value=3)
+
+        self.assertEqual(job.task, 'core.tests.test_jobs.record')
+        self.assertEqual(job.payload, {'value': 3})
+        self.assertEqual(job.status, Job.QUEUED)
+
+    def test_claim_due_jobs_in_order(self):
+        """Test only due jobs are claimed, oldest first, up to the limit"""
+        first = jobs.enqueue(record, value=1)
+        second = jobs.enqueue(record, value=2)
+        jobs.enqueue(record, value=3)
+        jobs.enqueue(record, delay=60, value=4)
+
+        ids = jobs.claim('worker-1', 2)
+
+        self.assertEqual(ids, [first.id, second.id])
+        first.refresh_from_db()
+        self.assertEqual(first.status, Job.RUNNING)
+        self.assertEqual(first.attempts, 1)
+        self.assertEqual(first.locked_by, 'worker-1')
+        self.assertEqual(len(jobs.claim('worker-2', 10)), 1)
+
+    def test_execute_success(self):
+        """Test a successful job runs the task and is marked succeeded"""
+        job = jobs.enqueue(record, value='ok')
+        jobs.claim('worker', 1)
+
+        self.assertTrue(jobs.execute(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual(CALLS, ['ok'])
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(job.locked_by, '')
+
+    def test_execute_failure_retries_with_backoff(self):
+        """Test failed jobs are requeued with an exponential delay"""
+        job = jobs.enqueue(explode)
+        jobs.claim('worker', 1)
+
+        self.assertFalse(jobs.execute(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('RuntimeError: boom', job.last_error)
+        delay = (job.run_at - timezone.now()).total_seconds()
+        self.assertTrue(5 < delay <= 10)
+        self.assertEqual(jobs.backoff(2), 15)
+
+    def test_execute_failure_gives_up(self):
+        """Test a job failing its last attempt is marked failed"""
+        job = jobs.enqueue(explode, max_attempts=1)
+        jobs.claim('worker', 1)
+
+        jobs.execute(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_requeue_stale(self):
+        """Test jobs locked by a dead worker are run again"""
+        job = jobs.enqueue(record, value=1)
+        hopeless = jobs.enqueue(record, max_attempts=1, value=2)
+        jobs.claim('dead-worker', 2)
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(jobs.requeue_stale(), 2)
+
+        job.refresh_from_db()
+        hopeless.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(hopeless.status, Job.FAILED)
+
+
+class JobApiTests(TestCase):
+    """Test the job status endpoint"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_auth_required(self):
+        """Test authentication is required to see jobs"""
+        res = APIClient().get(JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_own_jobs(self):
+        """Test only the user's jobs are listed, newest first"""
+        other = create_user(email='other@example.com', username='other')
+        jobs.enqueue(record, user=other, value=0)
+        first = jobs.enqueue(record, user=self.user, value=1)
+        second = jobs.enqueue(record, user=self.user, value=2)
+
+        res = self.client.get(JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [job['id'] for job in res.data['results']],
+            [second.id, first.id],
+        )
+
+    def test_retrieve_job_status(self):
+        """Test retrieving the status of a job"""
+        job = jobs.enqueue(record, user=self.user, value=1)
+
+        res = self.client.get(reverse('core:job-detail', args=[job.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], Job.QUEUED)
+        self.assertEqual(res.data['task'], 'core.tests.test_jobs.record')
+
+    def test_failure_hides_traceback(self):
+        """Test clients see the exception but not the server traceback"""
+        job = jobs.enqueue(explode, user=self.user)
+        jobs.claim('worker', 1)
+        jobs.execute(job.id)
+
+        res = self.client.get(reverse('core:job-detail', args=[job.id]))
+
+        self.assertEqual(res.data['last_error'], 'RuntimeError: boom')
+        job.refresh_from_db()
+        self.assertIn('Traceback', job.last_error)
+
+
+class RunWorkerTests(TransactionTestCase):
+    """Test the run_worker command, whose threads need committed jobs"""
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_burst_runs_queued_jobs(self):
+        """Test a burst worker drains the queue and exits"""
+        for value in range(5):
+            jobs.enqueue(record, value=value)
+        failing = jobs.enqueue(explode, max_attempts=1)
+        out = StringIO()
+
+        call_command(
+            'run_worker', '--burst', '--concurrency', '2', stdout=out)
+
+        self.assertEqual(sorted(CALLS), [0, 1, 2, 3, 4])
+        self.assertEqual(
+            Job.objects.filter(status=Job.SUCCEEDED).count(), 5)
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, Job.FAILED)
+        self.assertIn('5 succeeded, 1 failed', out.getvalue())
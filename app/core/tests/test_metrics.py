@@ -0,0 +1,172 @@
+"""Tests for the request metrics"""
+import gc
+import json
+import os
+import tempfile
+import threading
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+
+
+METRICS_URL = reverse('metrics')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+@override_settings(METRICS={'TOKEN': 'secret'})
+class MetricsTests(TestCase):
+    """Test the metrics middleware and endpoint"""
+
+    def setUp(self):
+        metrics.registry.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            username='user',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        metrics.registry.clear()
+
+    def _scrape(self):
+        """Return the metrics as read by the scraper"""
+        return self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+
+    def test_records_requests_per_view(self):
+        """Test status counts, latency and queries are kept per view"""
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+        APIClient().get(TAGS_URL)
+
+        res = self._scrape()
+        body = res.content.decode()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            'http_requests_total{view="recipe:tag-list",method="GET",'
+            'status="200"} 2',
+            body,
+        )
+        self.assertIn(
+            'http_requests_total{view="recipe:tag-list",method="GET",'
+            'status="401"} 1',
+            body,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{view="recipe:tag-list",'
+            'method="GET",le="+Inf"} 3',
+            body,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count{view="recipe:tag-list",'
+            'method="GET"} 3',
+            body,
+        )
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        queries = [
+            line for line in body.splitlines()
+            if line.startswith('http_request_sql_queries_total{view="recipe')
+        ]
+        self.assertTrue(queries)
+        self.assertGreater(int(queries[0].rsplit(' ', 1)[1]), 0)
+
+    def test_unresolved_requests(self):
+        """Test requests that match no url share a single label"""
+        self.client.get('/no-such-page/')
+
+        body = self._scrape().content.decode()
+
+        self.assertIn('view="<unresolved>"', body)
+
+    def test_token_required(self):
+        """Test the endpoint requires the configured bearer token"""
+        res = self.client.get(METRICS_URL)
+        wrong = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer no')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(wrong.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._scrape().status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS={})
+    def test_denied_by_default(self):
+        """Test anonymous reads are refused without any setting"""
+        self.client.force_login(self.user)
+        res = self.client.get(METRICS_URL)
+        self.user.is_staff = True
+        self.user.save()
+        staff = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(staff.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS={'ALLOW_ANONYMOUS': True})
+    def test_anonymous_allowed_explicitly(self):
+        """Test the endpoint can be opened to anyone on purpose"""
+        res = APIClient().get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_counters_are_thread_safe(self):
+        """Test concurrent increments from many threads are not lost"""
+        labels = (('view', 'test'),)
+
+        def work():
+            for _ in range(1000):
+                metrics.registry.inc('test_total', labels)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(
+            metrics.collect()['counters'][('test_total', labels)], 8000)
+
+    def test_finished_threads_folded(self):
+        """Test shards of finished threads are dropped, keeping counts"""
+        labels = (('view', 'test'),)
+        shards = len(metrics.registry._shards)
+
+        for _ in range(5):
+            thread = threading.Thread(
+                target=metrics.registry.inc, args=('test_total', labels))
+            thread.start()
+            thread.join()
+            del thread
+            gc.collect()
+
+        self.assertEqual(len(metrics.registry._shards), shards)
+        self.assertEqual(
+            metrics.collect()['counters'][('test_total', labels)], 5)
+
+    def test_aggregates_other_processes(self):
+        """Test snapshots flushed by other workers are added in"""
+        metrics.registry.inc('test_total', (('view', 'test'),), 2)
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, '999999.json'), 'w') as f:
+                json.dump({
+                    'counters': [['test_total', [['view', 'test']], 5]],
+                    'histograms': [],
+                    'gauges': [['db_pool_connections',
+                                [['alias', 'default'], ['state', 'idle']],
+                                3]],
+                }, f)
+            with override_settings(METRICS={'DIR': directory}):
+                metrics.registry.flush(force=True)
+                body = metrics.render()
+                own = os.path.join(directory, f'{os.getpid()}.json')
+                self.assertTrue(os.path.exists(own))
+
+        self.assertIn('test_total{view="test"} 7', body)
+        # The other worker is not running, so its gauges are dropped
+        self.assertNotIn('db_pool_connections', body)
@@ -1,4 +1,5 @@
 """Tests for models"""
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from unittest.mock import patch
@@ -106,6 +107,20 @@ class ModelTests(TestCase):
         )
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name"""
+        user = create_user()
+        models.Tag.objects.create(user=user, name="Vegan")
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name="Vegan")
+
+    def test_ingredient_name_unique_per_user(self):
+        """Test a user cannot have two ingredients with the same name"""
+        user = create_user()
+        models.Ingredient.objects.create(user=user, name="Salt")
+        with self.assertRaises(IntegrityError):
+            models.Ingredient.objects.create(user=user, name="Salt")
+
     @patch('core.models.uuid.uuid4')
     def test_recipe_filename_uuid(self, mock_uuid):
         """Test Generating Image Path"""
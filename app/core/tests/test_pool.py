@@ -0,0 +1,174 @@
+"""Tests for the database connection pool"""
+from unittest.mock import patch
+
+from django.db import connection, connections
+from django.test import SimpleTestCase
+from psycopg2 import extensions
+
+from core.db import pool as db_pool
+from core.db.backends.postgresql_pool.base import DatabaseWrapper
+
+
+class FakeCursor:
+    """Cursor of a fake connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql):
+        if self.conn.broken:
+            raise extensions.QueryCanceledError('server closed')
+
+
+class FakeConnection:
+    """Stand-in for a psycopg2 connection"""
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def create_pool(**kwargs):
+    """Return a pool with test defaults"""
+    options = {
+        'min_size': 0,
+        'max_size': 2,
+        'max_lifetime': 60,
+        'timeout': 0.05,
+        'check': True,
+    }
+    options.update(kwargs)
+    return db_pool.ConnectionPool(**options)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test checking connections in and out of the pool"""
+
+    def test_reuses_returned_connection(self):
+        """Test a returned connection is checked out again"""
+        pool = create_pool()
+        conn = pool.getconn(FakeConnection)
+        pool.putconn(conn)
+
+        self.assertIs(pool.getconn(FakeConnection), conn)
+        stats = pool.stats()
+        self.assertEqual(stats['connects'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_full_pool_times_out(self):
+        """Test checkout fails once every connection is in use"""
+        pool = create_pool(max_size=1)
+        pool.getconn(FakeConnection)
+
+        with self.assertRaises(db_pool.PoolTimeout):
+            pool.getconn(FakeConnection)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_dead_connection_replaced(self):
+        """Test a connection failing the liveness check is replaced"""
+        pool = create_pool()
+        conn = pool.getconn(FakeConnection)
+        pool.putconn(conn)
+        conn.broken = True
+
+        new = pool.getconn(FakeConnection)
+
+        self.assertIsNot(new, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['failed_checks'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_expired_connection_closed(self):
+        """Test connections older than the lifetime are not reused"""
+        pool = create_pool(max_lifetime=10)
+        with patch('core.db.pool.time.monotonic', return_value=100):
+            conn = pool.getconn(FakeConnection)
+            pool.putconn(conn)
+        with patch('core.db.pool.time.monotonic', return_value=111):
+            new = pool.getconn(FakeConnection)
+
+        self.assertIsNot(new, conn)
+        self.assertTrue(conn.closed)
+
+    def test_open_transaction_rolled_back(self):
+        """Test a connection returned mid-transaction is rolled back"""
+        pool = create_pool()
+        conn = pool.getconn(FakeConnection)
+        conn.status = extensions.TRANSACTION_STATUS_INTRANS
+
+        pool.putconn(conn)
+
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_unknown_state_discarded(self):
+        """Test a connection in an unknown state is closed"""
+        pool = create_pool()
+        conn = pool.getconn(FakeConnection)
+        conn.status = extensions.TRANSACTION_STATUS_UNKNOWN
+
+        pool.putconn(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_fill_opens_min_size(self):
+        """Test the pool is filled to its minimum size"""
+        pool = create_pool(min_size=2)
+
+        pool.fill(FakeConnection)
+
+        self.assertEqual(pool.stats()['idle'], 2)
+
+
+class PooledBackendTests(SimpleTestCase):
+    """Test the pooled PostgreSQL backend against the test database"""
+    databases = {'default'}
+
+    def setUp(self):
+        self.wrapper = DatabaseWrapper(
+            dict(connection.settings_dict), alias='pool-test')
+        # connection_created handlers look the alias up, e.g. the hstore
+        # oids of django.contrib.postgres
+        connections['pool-test'] = self.wrapper
+
+    def tearDown(self):
+        self.wrapper.close()
+        del connections['pool-test']
+        db_pool.close_pools()
+
+    def test_close_returns_connection_to_pool(self):
+        """Test closing the Django connection keeps the socket open"""
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            first = cursor.fetchone()[0]
+        raw = self.wrapper.connection
+        self.wrapper.close()
+
+        self.assertFalse(raw.closed)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            self.assertEqual(cursor.fetchone()[0], first)
+        self.assertEqual(db_pool.stats()['pool-test']['connects'], 1)
@@ -0,0 +1,94 @@
+"""Tests for the Server-Timing middleware"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.models import Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_user(is_staff=False):
+    """Create and return a user with an api token"""
+    user = get_user_model().objects.create_user(
+        email='user@example.com',
+        username='user',
+        password='testpass123',
+        is_staff=is_staff,
+    )
+    Tag.objects.create(user=user, name='Vegan')
+    return user
+
+
+@override_settings(SERVER_TIMING={'TOKEN': 'let-me-see'})
+class ServerTimingTests(TestCase):
+    """Test the opt-in request timings"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.client = APIClient()
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def _authenticate(self, user):
+        """Send the user's token with every request"""
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def _phases(self, res):
+        """Return the metric names of the Server-Timing header"""
+        return [
+            entry.split(';')[0].strip()
+            for entry in res['Server-Timing'].split(',')
+        ]
+
+    def test_not_added_without_header(self):
+        """Test nothing is reported unless requested"""
+        self._authenticate(create_user(is_staff=True))
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertFalse(res.has_header('Server-Timing'))
+
+    def test_staff_get_phases(self):
+        """Test staff users get the timings of every phase"""
+        self._authenticate(create_user(is_staff=True))
+
+        res = self.client.get(TAGS_URL, HTTP_X_SERVER_TIMING='1')
+
+        self.assertEqual(
+            self._phases(res),
+            ['auth', 'db', 'serialize', 'render', 'total'],
+        )
+        self.assertRegex(res['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ q')
+
+    def test_hidden_from_other_users(self):
+        """Test users that are not staff do not get timings"""
+        self._authenticate(create_user())
+
+        res = self.client.get(TAGS_URL, HTTP_X_SERVER_TIMING='1')
+
+        self.assertFalse(res.has_header('Server-Timing'))
+
+    def test_token_enables_timings(self):
+        """Test the configured token enables timings for anyone"""
+        self._authenticate(create_user())
+
+        res = self.client.get(TAGS_URL, HTTP_X_SERVER_TIMING='let-me-see')
+
+        self.assertIn('total', self._phases(res))
+
+    def test_sql_trace(self):
+        """Test the executed statements are listed on request"""
+        self._authenticate(create_user(is_staff=True))
+
+        res = self.client.get(TAGS_URL, HTTP_X_SERVER_TIMING='1,sql')
+
+        phases = self._phases(res)
+        self.assertIn('sql-1', phases)
+        self.assertIn('desc="SELECT', res['Server-Timing'])
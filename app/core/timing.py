@@ -0,0 +1,69 @@
+"""
+Per-request phase timings reported in the Server-Timing header
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'HEADER': 'X-Server-Timing',
+    'TOKEN': None,
+    'MAX_SQL': 50,
+    'SQL_LENGTH': 120,
+}
+
+current = ContextVar('server_timing', default=None)
+
+
+def get_config():
+    """Return the Server-Timing settings merged with the defaults"""
+    return {**DEFAULTS, **getattr(settings, 'SERVER_TIMING', {})}
+
+
+class Timing:
+    """Durations of the phases of a single request"""
+
+    def __init__(self, trace_sql=False, max_sql=0):
+        self.trace_sql = trace_sql
+        self.max_sql = max_sql
+        self.phases = {}
+        self.active = set()
+        self.queries = []
+        self.query_count = 0
+        self.db = 0.0
+        self.db_by_phase = {}
+        self.view_start = None
+        self.db_at_view_start = 0.0
+        self.db_in_view = 0.0
+
+    def add(self, name, seconds):
+        """Add to the duration of a phase"""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def record_sql(self, sql, seconds):
+        """Add a query to the database time, see core/db/tracing.py"""
+        self.query_count += 1
+        self.db += seconds
+        for name in self.active:
+            self.db_by_phase[name] = self.db_by_phase.get(name, 0.0) + seconds
+        if self.trace_sql and len(self.queries) < self.max_sql:
+            self.queries.append((' '.join(sql.split()), seconds))
+
+
+@contextmanager
+def phase(name):
+    """Time a phase of the current request, if it is being timed"""
+    timing = current.get()
+    if timing is None:
+        yield
+        return
+    timing.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.active.discard(name)
+        timing.add(name, time.perf_counter() - start)
@@ -0,0 +1,18 @@
+"""
+URLs mapping for the core app
+"""
+from django.urls import (
+    path,
+    include,
+)
+from rest_framework.routers import DefaultRouter
+from core import views
+
+router = DefaultRouter()
+router.register('jobs', views.JobViewSet)
+
+app_name = 'core'
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,63 @@
+"""
+Views for the core api
+"""
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import viewsets
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+from core.authentication import CachedTokenAuthentication
+from core import metrics
+from core.health import readiness
+from core.models import Job
+from core.serializers import JobSerializer
+
+
+class JobCursorPagination(CursorPagination):
+    """Paginate jobs by the newest first"""
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Show the status of the authenticated user's background jobs"""
+    serializer_class = JobSerializer
+    queryset = Job.objects.all()
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    pagination_class = JobCursorPagination
+
+    def get_queryset(self):
+        """Return jobs of the authenticated user"""
+        return self.queryset.filter(user=self.request.user).order_by('-id')
+
+
+@require_GET
+def health_live(request):
+    """Report that the process is up, without touching the database"""
+    return JsonResponse({'status': 'ok'})
+
+
+@require_GET
+def health_ready(request):
+    """Report whether the database is reachable and fully migrated"""
+    ready, checks = readiness.get()
+    return JsonResponse(
+        {'status': 'ok' if ready else 'unavailable', 'checks': checks},
+        status=200 if ready else 503,
+    )
+
+
+@require_GET
+def metrics_view(request):
+    """Expose the request metrics of every worker to Prometheus"""
+    if not metrics.can_scrape(request):
+        response = HttpResponse(status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,115 @@
+"""
+Async read endpoints for the recipe api, served through app/asgi.py
+"""
+from asgiref.sync import sync_to_async
+from django.db import connections
+from rest_framework import exceptions, mixins
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.request import Request
+from core.authentication import AsyncCachedTokenAuthentication
+from recipe import views
+
+
+authentication = AsyncCachedTokenAuthentication()
+
+# Used for viewsets that do not expose the action on the sync api
+READ_ACTIONS = {
+    'list': mixins.ListModelMixin.list,
+    'retrieve': mixins.RetrieveModelMixin.retrieve,
+}
+
+
+class ResolvedAuthentication(BaseAuthentication):
+    """Replay the outcome of authenticating in the event loop"""
+
+    def __init__(self, user, error):
+        self.user = user
+        self.error = error
+
+    def authenticate(self, request):
+        """Return the resolved user, or raise the authentication error"""
+        if self.error is not None:
+            raise self.error
+        return None if self.user is None else (self.user, None)
+
+    def authenticate_header(self, request):
+        """Return the challenge of the token authentication"""
+        return authentication.authenticate_header(request)
+
+
+def _run_action(viewset_class, basename, action, request, user, error,
+                kwargs):
+    """Run a read action of the viewset the way dispatch() would
+
+    Only the token check is replaced, by the outcome resolved in the event
+    loop; permissions, throttles, negotiation and rendering are the same.
+    """
+    drf_request = Request(
+        request, authenticators=(ResolvedAuthentication(user, error),))
+    view = viewset_class(
+        basename=basename,
+        action=action,
+        detail=action == 'retrieve',
+        args=(),
+        kwargs=kwargs,
+        format_kwarg=None,
+    )
+    # Bound like as_view() binds the action map, for Allow and OPTIONS
+    view.get = getattr(view, action, None) \
+        or READ_ACTIONS[action].__get__(view)
+    view.request = drf_request
+    view.headers = view.default_response_headers
+    try:
+        view.initial(drf_request)
+        method = request.method.lower()
+        handler = view.http_method_not_allowed
+        if method in ('get', 'options'):
+            handler = getattr(view, method)
+        response = handler(drf_request, **kwargs)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+    response = view.finalize_response(drf_request, response)
+    if callable(getattr(response, 'render', None)):
+        response = response.render()
+    return response
+
+
+def _run_action_in_thread(*args):
+    """Run the action, closing the connections of the executor thread
+
+    Django only closes connections around requests on its own thread, so
+    the executor threads close theirs after every call.
+    """
+    try:
+        return _run_action(*args)
+    finally:
+        connections.close_all()
+
+
+def async_read_view(viewset_class, basename, action):
+    """Return an async view running a read action of the viewset"""
+    # Not thread sensitive: Django 3.2 serves every thread sensitive call of
+    # an ASGI request on one shared thread, one request after another
+    run_action = sync_to_async(_run_action_in_thread, thread_sensitive=False)
+
+    async def view(request, **kwargs):
+        """Authenticate in the event loop and query in a worker thread"""
+        user = error = None
+        try:
+            user = await authentication.authenticate_async(request)
+        except exceptions.APIException as exc:
+            error = exc
+        return await run_action(
+            viewset_class, basename, action, request, user, error, kwargs)
+
+    return view
+
+
+recipe_list = async_read_view(views.RecipeViewSet, 'recipe', 'list')
+recipe_detail = async_read_view(views.RecipeViewSet, 'recipe', 'retrieve')
+tag_list = async_read_view(views.TagViewSet, 'tag', 'list')
+tag_detail = async_read_view(views.TagViewSet, 'tag', 'retrieve')
+ingredient_list = async_read_view(
+    views.IngredientViewSet, 'ingredient', 'list')
+ingredient_detail = async_read_view(
+    views.IngredientViewSet, 'ingredient', 'retrieve')
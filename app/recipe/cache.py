@@ -0,0 +1,222 @@
+"""
+Per-user response cache for the recipe api list endpoints
+"""
+import functools
+import hashlib
+import random
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from core import compression
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CACHE': 'default',
+    'TIMEOUT': 300,
+}
+
+# Cached lists depend on the user and the encoding; both the hits and the
+# misses send these, in this order
+VARY_HEADERS = ('Accept', 'Accept-Encoding', 'Authorization')
+
+
+def get_config():
+    """Return the response cache settings merged with the defaults"""
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_CACHE', {})}
+
+
+class ResponseCache:
+    """Cache of list payloads invalidated by a per-user generation"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    @property
+    def cache(self):
+        """Return the configured cache backend"""
+        return caches[get_config()['CACHE']]
+
+    def _count(self, name):
+        """Increment a hit/miss counter"""
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        """Return a snapshot of the hit/miss counters"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _generation_key(self, user_id):
+        """Return the key holding the generation of the user"""
+        return f'recipe:gen:{user_id}'
+
+    def _seed(self, key):
+        """Start the generation of a user at a random value
+
+        A counter evicted from the cache must not restart at a generation
+        whose entries may still be cached.
+        """
+        seed = random.getrandbits(48)
+        if self.cache.add(key, seed, timeout=None):
+            return seed
+        return self.cache.get(key, seed)
+
+    def generation(self, user_id):
+        """Return the current cache generation of the user"""
+        key = self._generation_key(user_id)
+        generation = self.cache.get(key)
+        if generation is None:
+            generation = self._seed(key)
+        return generation
+
+    def invalidate(self, user_id):
+        """Expire every cached list of the user"""
+        key = self._generation_key(user_id)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self._seed(key)
+        self._count('invalidations')
+
+    def key(self, user_id, name, url, params):
+        """Return the cache key for a list of the user
+
+        The payload holds absolute next/previous links, so the url of the
+        list, with its scheme and host, is part of the key.
+        """
+        digest = hashlib.sha1(f'{url}?{params}'.encode()).hexdigest()
+        generation = self.generation(user_id)
+        return f'recipe:list:{user_id}:{generation}:{name}:{digest}'
+
+    def get(self, key):
+        """Return the cached payload, counting the hit or miss"""
+        data = self.cache.get(key)
+        self._count('misses' if data is None else 'hits')
+        return data
+
+    def set(self, key, data):
+        """Cache a payload"""
+        self.cache.set(key, data, get_config()['TIMEOUT'])
+
+    def get_encoded(self, key, encoding):
+        """Return the cached (content type, body) of a compressed payload"""
+        encoded = self.cache.get(f'{key}:{encoding}')
+        if encoded is not None:
+            self._count('hits')
+        return encoded
+
+    def set_encoded(self, key, encoding, content_type, body):
+        """Cache the rendered payload compressed with the encoding"""
+        self.cache.set(
+            f'{key}:{encoding}', (content_type, body),
+            get_config()['TIMEOUT'])
+
+
+response_cache = ResponseCache()
+
+
+def _normalize_ids(value):
+    """Return a comma separated list of ids as a sorted, unique string"""
+    return ','.join(str(i) for i in sorted({int(v) for v in value.split(',')}))
+
+
+def _normalize_names(value):
+    """Return a comma separated list of names as a sorted, unique string"""
+    return ','.join(sorted({
+        name.strip() for name in value.split(',') if name.strip()
+    }))
+
+
+def _normalize_flag(value):
+    """Return an integer flag as '0' or '1'"""
+    return str(int(bool(int(value))))
+
+
+NORMALIZERS = {
+    'tags': _normalize_ids,
+    'ingredients': _normalize_ids,
+    'assigned_only': _normalize_flag,
+    'fields': _normalize_names,
+    'exclude': _normalize_names,
+}
+
+
+class CachedListMixin:
+    """Serve list responses from the per-user response cache"""
+    cache_params = ()
+
+    def _get_cache_params(self):
+        """Return the normalized query params that select the payload"""
+        parts = []
+        for name in self.cache_params + ('cursor', 'page_size'):
+            value = self.request.query_params.get(name)
+            if value in (None, ''):
+                continue
+            normalize = NORMALIZERS.get(name, str)
+            parts.append(f'{name}={normalize(value)}')
+        return '&'.join(parts)
+
+    def invalidate_cache(self):
+        """Expire the cached lists of the authenticated user"""
+        response_cache.invalidate(self.request.user.id)
+
+    def _get_cache_encoding(self, request):
+        """Return the encoding of a cacheable compressed body, or None"""
+        renderer = getattr(request, 'accepted_renderer', None)
+        # Only plain JSON, the browsable API renders per request data
+        if not isinstance(renderer, JSONRenderer) \
+                or request.accepted_media_type != renderer.media_type:
+            return None
+        return compression.negotiate(request)
+
+    def _store_encoded(self, key, encoding, response):
+        """Compress the rendered response and cache its body"""
+        compression.compress_response(self.request, response)
+        if response.get('Content-Encoding') == encoding:
+            response_cache.set_encoded(
+                key, encoding, response['Content-Type'], response.content)
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached list, computing it on a miss"""
+        if not get_config()['ENABLED']:
+            return super().list(request, *args, **kwargs)
+        try:
+            params = self._get_cache_params()
+        except ValueError:
+            return super().list(request, *args, **kwargs)
+
+        key = response_cache.key(
+            request.user.id,
+            self.basename,
+            request.build_absolute_uri(request.path),
+            params,
+        )
+        encoding = self._get_cache_encoding(request)
+        if encoding is not None:
+            encoded = response_cache.get_encoded(key, encoding)
+            if encoded is not None:
+                content_type, body = encoded
+                response = HttpResponse(body, content_type=content_type)
+                response['Content-Encoding'] = encoding
+                patch_vary_headers(response, VARY_HEADERS)
+                return response
+
+        data = response_cache.get(key)
+        if data is not None:
+            response = Response(data)
+        else:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response_cache.set(key, response.data)
+        patch_vary_headers(response, VARY_HEADERS)
+        if encoding is not None:
+            response.add_post_render_callback(
+                functools.partial(self._store_encoded, key, encoding))
+        return response
@@ -0,0 +1,24 @@
+"""
+System checks for the recipe app
+"""
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+from recipe.cache import get_config
+
+
+@register(Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    """Reject a response cache kept in the memory of each process"""
+    config = get_config()
+    if config['ENABLED'] and isinstance(caches[config['CACHE']], LocMemCache):
+        return [Error(
+            'RESPONSE_CACHE is enabled on a LocMemCache backend.',
+            hint=(
+                'Writes would only invalidate the lists cached by the '
+                'process making them. Configure a shared cache backend or '
+                'set RESPONSE_CACHE_ENABLED=0.'
+            ),
+            id='recipe.E001',
+        )]
+    return []
@@ -0,0 +1,67 @@
+"""
+Streaming exports for the recipe api
+"""
+import csv
+
+from django.db.models import prefetch_related_objects
+from rest_framework.utils.encoders import JSONEncoder
+
+
+CHUNK_SIZE = 500
+
+CSV_COLUMNS = [
+    'id', 'title', 'description', 'price',
+    'time_minutes', 'link', 'tags', 'ingredients',
+]
+
+
+class Echo:
+    """File-like object that returns what is written to it"""
+
+    def write(self, value):
+        """Return the value instead of buffering it"""
+        return value
+
+
+def iter_chunks(queryset, prefetches, chunk_size=CHUNK_SIZE):
+    """Walk a queryset with a server-side cursor, prefetching per chunk"""
+    chunk = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) == chunk_size:
+            prefetch_related_objects(chunk, *prefetches)
+            yield chunk
+            chunk = []
+    if chunk:
+        prefetch_related_objects(chunk, *prefetches)
+        yield chunk
+
+
+def ndjson_lines(chunks, serializer_class, context):
+    """Yield one JSON document per recipe"""
+    encoder = JSONEncoder()
+    for chunk in chunks:
+        data = serializer_class(chunk, many=True, context=context).data
+        for item in data:
+            yield encoder.encode(item) + '\n'
+
+
+def csv_lines(chunks):
+    """Yield a CSV header and one row per recipe"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for chunk in chunks:
+        for recipe in chunk:
+            yield writer.writerow([
+                recipe.id,
+                recipe.title,
+                recipe.description,
+                recipe.price,
+                recipe.time_minutes,
+                recipe.link,
+                '|'.join(tag.name for tag in recipe.tags.all()),
+                '|'.join(
+                    ingredient.name
+                    for ingredient in recipe.ingredients.all()
+                ),
+            ])
@@ -0,0 +1,180 @@
+"""
+Read-only fast path rendering list pages from values() rows
+"""
+import functools
+from django.conf import settings
+from django.db import models
+from rest_framework import serializers
+from rest_framework.response import Response
+
+
+DEFAULTS = {
+    'ENABLED': True,
+}
+
+# Fields whose output equals the value loaded from the database
+PASSTHROUGH = {
+    serializers.CharField: (str,),
+    serializers.IntegerField: (int,),
+    serializers.BooleanField: (bool,),
+}
+
+
+def get_config():
+    """Return the fast list settings merged with the defaults"""
+    return {**DEFAULTS, **getattr(settings, 'RECIPE_FAST_LIST', {})}
+
+
+class Unsupported(Exception):
+    """Raised for serializers the fast path cannot reproduce"""
+
+
+def _plain_field(name, field, model):
+    """Return (passthrough types, to_representation) of a model field"""
+    concrete = {f.name for f in model._meta.concrete_fields}
+    if field.source != name or name not in concrete or isinstance(
+        field,
+        (serializers.BaseSerializer, serializers.FileField,
+         serializers.RelatedField, serializers.SerializerMethodField),
+    ):
+        raise Unsupported(name)
+    return PASSTHROUGH.get(type(field)), field.to_representation
+
+
+def _readable_fields(serializer):
+    """Return the (name, field) pairs of the serializer output"""
+    return [
+        (name, field) for name, field in serializer.fields.items()
+        if not field.write_only
+    ]
+
+
+def _convert(value, types, to_representation):
+    """Return the serialized value of a database value"""
+    if value is None or (types and type(value) in types):
+        return value
+    return to_representation(value)
+
+
+class RowSerializer:
+    """Build the list output of a ModelSerializer from values() rows
+
+    Plain model fields are converted by the serializer's own fields, nested
+    many=True model serializers of many-to-many fields are loaded with one
+    query on the link table, ordered by id like the prefetches of the views.
+    """
+
+    def __init__(self, serializer_class, names=None):
+        self.model = serializer_class.Meta.model
+        self.fields = []
+        columns = ['id']
+        for name, field in _readable_fields(serializer_class()):
+            if names is not None and name not in names:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                self.fields.append((name, self._nested(name, field)))
+            else:
+                self.fields.append(
+                    (name, _plain_field(name, field, self.model)))
+                columns.append(name)
+        self.columns = list(dict.fromkeys(columns))
+
+    def _nested(self, name, field):
+        """Return the query details of a nested list of related objects"""
+        child = field.child
+        if not isinstance(child, serializers.ModelSerializer) \
+                or field.source != name:
+            raise Unsupported(name)
+        m2m = self.model._meta.get_field(name)
+        if not isinstance(m2m, models.ManyToManyField):
+            raise Unsupported(name)
+        model = child.Meta.model
+        fields = [
+            (child_name, _plain_field(child_name, child_field, model))
+            for child_name, child_field in _readable_fields(child)
+        ]
+        target = m2m.m2m_reverse_field_name()
+        return {
+            'through': m2m.remote_field.through,
+            'source': m2m.m2m_column_name(),
+            'target': m2m.m2m_reverse_name(),
+            'lookups': [f'{target}__{child_name}' for child_name, _ in fields],
+            'fields': fields,
+        }
+
+    def rows(self, queryset):
+        """Return the queryset as rows of the rendered columns"""
+        annotations = list(queryset.query.annotations)
+        # The paginator reads the ordering columns of the last row
+        ordering = [
+            name.lstrip('-') for name in queryset.query.order_by
+            if isinstance(name, str)
+        ]
+        return queryset.prefetch_related(None).values(*dict.fromkeys(
+            self.columns + ordering + annotations))
+
+    def _load_nested(self, nested, ids):
+        """Return {parent id: [item, ...]} for a nested field"""
+        items = {}
+        objects = {}
+        rows = nested['through'].objects.filter(
+            **{f'{nested["source"]}__in': ids},
+        ).order_by(nested['target']).values_list(
+            nested['source'], nested['target'], *nested['lookups'])
+        for parent_id, obj_id, *values in rows:
+            obj = objects.get(obj_id)
+            if obj is None:
+                obj = objects[obj_id] = {
+                    name: _convert(value, *spec)
+                    for (name, spec), value in zip(nested['fields'], values)
+                }
+            items.setdefault(parent_id, []).append(obj)
+        return items
+
+    def serialize(self, rows):
+        """Return the serialized rows as a list of plain dicts"""
+        ids = [row['id'] for row in rows]
+        loaded = {
+            name: self._load_nested(spec, ids) if ids else {}
+            for name, spec in self.fields if isinstance(spec, dict)
+        }
+        data = []
+        for row in rows:
+            item = {}
+            for name, spec in self.fields:
+                if isinstance(spec, dict):
+                    item[name] = loaded[name].get(row['id'], [])
+                else:
+                    item[name] = _convert(row[name], *spec)
+            data.append(item)
+        return data
+
+
+@functools.lru_cache(maxsize=256)
+def get_row_serializer(serializer_class, names=None):
+    """Return the row serializer of the class, or None if unsupported"""
+    try:
+        return RowSerializer(serializer_class, names)
+    except Unsupported:
+        return None
+
+
+class FastListMixin:
+    """Serve list pages through a RowSerializer when possible"""
+
+    def get_sparse_fields(self):
+        """Return the rendered field names, None for all of them"""
+        return None
+
+    def list(self, request, *args, **kwargs):
+        """Return the list, skipping model instances and field objects"""
+        row_serializer = get_row_serializer(
+            self.get_serializer_class(), self.get_sparse_fields())
+        if row_serializer is None or not get_config()['ENABLED']:
+            return super().list(request, *args, **kwargs)
+        queryset = row_serializer.rows(
+            self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(row_serializer.serialize(list(queryset)))
+        return self.get_paginated_response(row_serializer.serialize(page))
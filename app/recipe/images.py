@@ -0,0 +1,116 @@
+"""
+Resized recipe image variants generated by the job queue
+"""
+import io
+import os
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, features
+from core import jobs
+from core.models import Recipe
+
+
+DEFAULTS = {
+    'SIZES': {
+        'thumbnail': 160,
+        'small': 480,
+        'medium': 960,
+    },
+    'ASYNC': True,
+}
+
+FORMATS = {
+    'jpeg': ('JPEG', '.jpg', {'quality': 85, 'optimize': True}),
+    'webp': ('WEBP', '.webp', {'quality': 80, 'method': 4}),
+}
+
+
+def get_config():
+    """Return the image variant settings merged with the defaults"""
+    return {**DEFAULTS, **getattr(settings, 'RECIPE_IMAGE_VARIANTS', {})}
+
+
+def get_formats():
+    """Return the output formats supported by the installed Pillow"""
+    return {
+        name: spec for name, spec in FORMATS.items()
+        if name != 'webp' or features.check('webp')
+    }
+
+
+def variant_name(image_name, size, extension):
+    """Return the storage name of a variant next to the original"""
+    root = os.path.splitext(image_name)[0]
+    return f'{root}_{size}{extension}'
+
+
+def _render(original, max_size, image_format, options):
+    """Return the encoded bytes of a resized copy of the image"""
+    image = original.copy()
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(recipe_id, image_name):
+    """Create every size and format of a recipe image"""
+    recipe = Recipe.objects.only('id', 'image').filter(id=recipe_id).first()
+    if recipe is None or recipe.image.name != image_name:
+        return
+    storage = recipe.image.storage
+    with storage.open(image_name, 'rb') as f:
+        original = ImageOps.exif_transpose(Image.open(f))
+        original.load()
+
+    variants = {}
+    for size, max_size in get_config()['SIZES'].items():
+        variants[size] = {}
+        for name, (image_format, extension, options) in get_formats().items():
+            path = variant_name(image_name, size, extension)
+            if storage.exists(path):
+                storage.delete(path)
+            content = _render(original, max_size, image_format, options)
+            variants[size][name] = storage.save(path, ContentFile(content))
+
+    with transaction.atomic():
+        current = Recipe.objects.select_for_update().only(
+            'id', 'image').filter(id=recipe_id).first()
+        if current is None or current.image.name != image_name:
+            delete_variants(storage, variants)
+            return
+        Recipe.objects.filter(id=recipe_id).update(image_variants=variants)
+    return variants
+
+
+def delete_variants(storage, variants):
+    """Remove the files of previously generated variants"""
+    for formats in (variants or {}).values():
+        for path in formats.values():
+            storage.delete(path)
+
+
+def enqueue_variants(recipe):
+    """Queue generation of the recipe's image variants"""
+    recipe_id, image_name = recipe.id, recipe.image.name
+    if get_config()['ASYNC']:
+        return jobs.enqueue(
+            generate_variants,
+            user=recipe.user,
+            recipe_id=recipe_id,
+            image_name=image_name,
+        )
+    transaction.on_commit(lambda: generate_variants(recipe_id, image_name))
+
+
+def replace_variants(recipe):
+    """Drop the variants of the previous image and generate new ones"""
+    previous = recipe.image_variants
+    Recipe.objects.filter(id=recipe.id).update(image_variants={})
+    recipe.image_variants = {}
+    storage = recipe.image.storage
+    transaction.on_commit(lambda: delete_variants(storage, previous))
+    return enqueue_variants(recipe)
@@ -0,0 +1,27 @@
+"""
+Pagination classes for the recipe api
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class BaseCursorPagination(CursorPagination):
+    """Keyset pagination with opaque cursors and a client page size"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        """Return the view's ordering for this request, if it has one"""
+        get_cursor_ordering = getattr(view, 'get_cursor_ordering', None)
+        ordering = get_cursor_ordering() if get_cursor_ordering else None
+        return ordering or super().get_ordering(request, queryset, view)
+
+
+class RecipeCursorPagination(BaseCursorPagination):
+    """Paginate recipes by the newest first"""
+    ordering = '-id'
+
+
+class RecipeAttrCursorPagination(BaseCursorPagination):
+    """Paginate tags and ingredients in reverse name order"""
+    ordering = '-name'
@@ -1,6 +1,9 @@
 """
 Serializer for recipe API
 """
+from typing import Dict
+from django.db import transaction
+from django.utils.translation import gettext as _
 from rest_framework import serializers
 from core.models import (
     Recipe,
@@ -9,15 +12,89 @@ from core.models import (
 )
 
 
+BULK_MAX_ITEMS = 1000
+
+
+def get_or_create_by_name(model, user, names):
+    """Return the user's objects keyed by name, creating missing ones"""
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    objs = {
+        obj.name: obj
+        for obj in model.objects.filter(user=user, name__in=names)
+    }
+    missing = [name for name in names if name not in objs]
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        objs.update({
+            obj.name: obj
+            for obj in model.objects.filter(user=user, name__in=missing)
+        })
+    return objs
+
+
+def _get_through(field_name):
+    """Return the through model and its recipe and target columns"""
+    field = Recipe._meta.get_field(field_name)
+    return (
+        field.remote_field.through,
+        field.m2m_column_name(),
+        field.m2m_reverse_name(),
+    )
+
+
+def add_recipe_links(field_name, links):
+    """Insert (recipe id, object id) links with a single through insert"""
+    if not links:
+        return
+    through, source, target = _get_through(field_name)
+    through.objects.bulk_create(
+        [through(**{source: recipe_id, target: obj_id})
+         for recipe_id, obj_id in links],
+        ignore_conflicts=True,
+    )
+
+
+def set_recipe_links(field_name, wanted):
+    """Link each recipe id to exactly the wanted ids, writing the delta"""
+    if not wanted:
+        return
+    through, source, target = _get_through(field_name)
+    current = through.objects.filter(
+        **{f'{source}__in': wanted.keys()}
+    ).values_list('id', source, target)
+
+    stale_ids = []
+    existing = set()
+    for link_id, recipe_id, obj_id in current:
+        if obj_id in wanted[recipe_id]:
+            existing.add((recipe_id, obj_id))
+        else:
+            stale_ids.append(link_id)
+
+    if stale_ids:
+        through.objects.filter(id__in=stale_ids).delete()
+    add_recipe_links(field_name, [
+        (recipe_id, obj_id)
+        for recipe_id, obj_ids in wanted.items()
+        for obj_id in obj_ids
+        if (recipe_id, obj_id) not in existing
+    ])
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for Tag object"""
 
     class Meta:
         model = Tag
         fields = [
-            'id', 'name',
+            'id', 'name', 'recipe_count',
         ]
-        read_only_fields = ('id',)
+        read_only_fields = ('id', 'recipe_count')
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -26,9 +103,9 @@ class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = [
-            'id', 'name',
+            'id', 'name', 'recipe_count',
         ]
-        read_only_fields = ('id',)
+        read_only_fields = ('id', 'recipe_count')
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -44,26 +121,29 @@ class RecipeSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ('id',)
 
+    def _get_or_create_objects(self, model, items):
+        """Return the user's objects for the names, creating missing ones"""
+        auth_user = self.context['request'].user
+        names = [item['name'] for item in items]
+        objs = get_or_create_by_name(model, auth_user, names)
+        return [objs[name] for name in dict.fromkeys(names)]
+
+    def _set_related(self, recipe, field_name, objs):
+        """Replace the recipe's related objects, writing only the delta"""
+        set_recipe_links(field_name, {recipe.id: {obj.id for obj in objs}})
+        getattr(recipe, '_prefetched_objects_cache', {}).pop(field_name, None)
+
     def _get_or_create_tags(self, tags, recipe):
         """Handling or creating tags as needed"""
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag
-            )
-            recipe.tags.add(tag_obj)
+        objs = self._get_or_create_objects(Tag, tags)
+        add_recipe_links('tags', [(recipe.id, obj.id) for obj in objs])
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Handling or creating ingredients as needed"""
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient
-            )
-            recipe.ingredients.add(ingredient_obj)
+        objs = self._get_or_create_objects(Ingredient, ingredients)
+        add_recipe_links('ingredients', [(recipe.id, obj.id) for obj in objs])
 
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe"""
         tags = validated_data.pop('tags', [])
@@ -73,17 +153,21 @@ class RecipeSerializer(serializers.ModelSerializer):
         self._get_or_create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Update a recipe"""
         tags = validated_data.pop('tags', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._set_related(
+                instance, 'tags', self._get_or_create_objects(Tag, tags))
 
         ingredients = validated_data.pop('ingredients', None)
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._set_related(
+                instance,
+                'ingredients',
+                self._get_or_create_objects(Ingredient, ingredients),
+            )
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -94,11 +178,30 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail object"""
+    image_variants = serializers.SerializerMethodField()
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description', 'image']
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'image_variants',
+        ]
         read_only_fields = RecipeSerializer.Meta.read_only_fields
 
+    def get_image_variants(self, obj) -> Dict[str, Dict[str, str]]:
+        """Return the urls of the generated image sizes and formats"""
+        if not obj.image_variants:
+            return {}
+        storage = obj.image.storage
+        request = self.context.get('request')
+        variants = {}
+        for size, formats in obj.image_variants.items():
+            variants[size] = {}
+            for name, path in formats.items():
+                url = storage.url(path)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                variants[size][name] = url
+        return variants
+
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
@@ -114,3 +217,151 @@ class RecipeImageSerializer(serializers.ModelSerializer):
                 'required': True,
             }
         }
+
+
+class RecipeBulkCreateSerializer(RecipeSerializer):
+    """Serializer for a recipe created through the bulk endpoint"""
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['description']
+
+
+class RecipeBulkUpdateSerializer(RecipeBulkCreateSerializer):
+    """Serializer for a recipe updated through the bulk endpoint"""
+    id = serializers.IntegerField()
+
+    class Meta(RecipeBulkCreateSerializer.Meta):
+        read_only_fields = ()
+        extra_kwargs = {
+            'title': {'required': False},
+            'price': {'required': False},
+            'time_minutes': {'required': False},
+        }
+
+
+class RecipeBulkSerializer(serializers.Serializer):
+    """Serializer for creating, updating and deleting recipes in bulk"""
+
+    def get_fields(self):
+        """Return the batch fields, named like the create/update methods"""
+        return {
+            'create': RecipeBulkCreateSerializer(many=True, required=False),
+            'update': RecipeBulkUpdateSerializer(many=True, required=False),
+            'delete': serializers.ListField(
+                child=serializers.IntegerField(),
+                required=False,
+            ),
+        }
+
+    def _unknown_id_errors(self, ids, owned_ids):
+        """Return per item errors for ids the user does not own"""
+        errors = [
+            {} if recipe_id in owned_ids else {'id': [_('Recipe not found.')]}
+            for recipe_id in ids
+        ]
+        return errors if any(errors) else None
+
+    def validate(self, attrs):
+        """Validate batch size and that referenced recipes are owned"""
+        update_ids = [item['id'] for item in attrs.get('update', [])]
+        delete_ids = attrs.get('delete', [])
+        ids = update_ids + delete_ids
+        if len(attrs.get('create', [])) + len(ids) > BULK_MAX_ITEMS:
+            msg = _('A batch may contain at most %d recipes') % BULK_MAX_ITEMS
+            raise serializers.ValidationError(msg)
+
+        if len(set(ids)) != len(ids):
+            msg = _('A recipe may only appear once per batch')
+            raise serializers.ValidationError(msg)
+
+        owned_ids = set(Recipe.objects.filter(
+            user=self.context['request'].user,
+            id__in=ids,
+        ).values_list('id', flat=True))
+        errors = {
+            'update': self._unknown_id_errors(update_ids, owned_ids),
+            'delete': self._unknown_id_errors(delete_ids, owned_ids),
+        }
+        errors = {key: value for key, value in errors.items() if value}
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def _resolve_names(self, user, items, field_name, model):
+        """Return the user's objects for every name used by the items"""
+        names = [
+            obj['name']
+            for item in items
+            for obj in item.get(field_name) or []
+        ]
+        return get_or_create_by_name(model, user, names)
+
+    def _wanted_links(self, pairs, field_name, objs):
+        """Map recipe ids to the object ids requested by each item"""
+        return {
+            recipe.id: {objs[obj['name']].id for obj in item[field_name]}
+            for recipe, item in pairs
+            if item.get(field_name) is not None
+        }
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Apply the whole batch in a single transaction"""
+        user = self.context['request'].user
+        creates = validated_data.get('create', [])
+        updates = validated_data.get('update', [])
+        deletes = validated_data.get('delete', [])
+        items = creates + updates
+        related = {
+            'tags': self._resolve_names(user, items, 'tags', Tag),
+            'ingredients': self._resolve_names(
+                user, items, 'ingredients', Ingredient),
+        }
+
+        if deletes:
+            Recipe.objects.filter(user=user, id__in=deletes).delete()
+
+        created = Recipe.objects.bulk_create([
+            Recipe(user=user, **{
+                attr: value for attr, value in item.items()
+                if attr not in related
+            })
+            for item in creates
+        ])
+
+        instances = Recipe.objects.filter(user=user).in_bulk(
+            [item['id'] for item in updates])
+        updated = [instances[item['id']] for item in updates]
+        update_fields = set()
+        for recipe, item in zip(updated, updates):
+            for attr, value in item.items():
+                if attr != 'id' and attr not in related:
+                    setattr(recipe, attr, value)
+                    update_fields.add(attr)
+        if update_fields:
+            Recipe.objects.bulk_update(updated, sorted(update_fields))
+
+        pairs = list(zip(created, creates)) + list(zip(updated, updates))
+        for field_name, objs in related.items():
+            set_recipe_links(
+                field_name, self._wanted_links(pairs, field_name, objs))
+
+        recipes = Recipe.objects.filter(
+            id__in=[recipe.id for recipe, item in pairs]
+        ).prefetch_related('tags', 'ingredients').in_bulk()
+        return {
+            'create': [recipes[recipe.id] for recipe in created],
+            'update': [recipes[recipe.id] for recipe in updated],
+            'delete': deletes,
+        }
+
+    def to_representation(self, instance):
+        """Return the per item results of the batch"""
+        context = self.context
+        return {
+            'create': RecipeDetailSerializer(
+                instance['create'], many=True, context=context).data,
+            'update': RecipeDetailSerializer(
+                instance['update'], many=True, context=context).data,
+            'delete': list(instance['delete']),
+        }
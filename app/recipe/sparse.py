@@ -0,0 +1,69 @@
+"""
+Sparse fieldsets selected with the fields and exclude query params
+"""
+import functools
+from rest_framework.exceptions import ValidationError
+
+
+def split_names(value):
+    """Return the names of a comma separated param, None when missing"""
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+@functools.lru_cache(maxsize=None)
+def serializer_field_names(serializer_class):
+    """Return the output field names of the serializer in order"""
+    return tuple(
+        name for name, field in serializer_class().fields.items()
+        if not field.write_only
+    )
+
+
+class SparseFieldsMixin:
+    """Render only the fields asked for with ?fields= and ?exclude="""
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_fields(self):
+        """Return the rendered field names, or None to render them all"""
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = self._parse_sparse_fields()
+        return self._sparse_fields
+
+    def _parse_sparse_fields(self):
+        """Validate the fields and exclude params of the request"""
+        if self.request is None or self.action not in self.sparse_actions:
+            return None
+        params = self.request.query_params
+        fields = split_names(params.get('fields'))
+        exclude = split_names(params.get('exclude'))
+        if fields is None and exclude is None:
+            return None
+
+        available = serializer_field_names(self.get_serializer_class())
+        errors = {
+            param: [f'Unknown field "{name}".' for name in names
+                    if name not in available]
+            for param, names in (('fields', fields), ('exclude', exclude))
+            if names
+        }
+        errors = {param: value for param, value in errors.items() if value}
+        if errors:
+            raise ValidationError(errors)
+        return tuple(
+            name for name in available
+            if (fields is None or name in fields)
+            and name not in (exclude or ())
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer without the fields left out"""
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            target = getattr(serializer, 'child', serializer)
+            for name in list(target.fields):
+                if name not in fields:
+                    target.fields.pop(name)
+        return serializer
@@ -0,0 +1,219 @@
+"""
+Tests for the async read endpoints
+"""
+import asyncio
+import json
+import time
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.contrib.auth import get_user_model
+from django.test import (
+    RequestFactory,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.models import Recipe, Tag
+from recipe import async_views
+
+
+def create_user(email='user@example.com', username='user'):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='testpass123',
+    )
+
+
+class AsyncRecipeApiTests(TransactionTestCase):
+    """Test the async recipe, tag and ingredient read endpoints
+
+    The reads run on executor threads with their own connections, so the
+    test data has to be committed.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.factory = RequestFactory()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Curry',
+            price=Decimal('5.50'),
+            time_minutes=20,
+        )
+        self.recipe.tags.add(self.tag)
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def _get(self, view, url, token=None, **kwargs):
+        """Call an async view and return its response"""
+        key = self.token.key if token is None else token
+        request = self.factory.get(url, HTTP_AUTHORIZATION=f'Token {key}')
+        return async_to_sync(view)(request, **kwargs)
+
+    def test_auth_required(self):
+        """Test requests without a token are rejected"""
+        url = reverse('recipe-async:recipe-list')
+        request = self.factory.get(url)
+
+        res = async_to_sync(async_views.recipe_list)(request)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+    def test_invalid_token(self):
+        """Test requests with an unknown token are rejected"""
+        url = reverse('recipe-async:recipe-list')
+
+        res = self._get(async_views.recipe_list, url, token='nope')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(json.loads(res.content), {'detail': 'Invalid token.'})
+
+    def test_unauthenticated_matches_sync_api(self):
+        """Test anonymous requests fail like on the sync api"""
+        client = APIClient()
+        for view, name, kwargs in (
+            (async_views.recipe_list, 'recipe-list', {}),
+            (async_views.tag_detail, 'tag-detail', {'pk': self.tag.id}),
+        ):
+            request = self.factory.post(
+                reverse(f'recipe-async:{name}', kwargs=kwargs))
+            expected = client.post(reverse(f'recipe:{name}', kwargs=kwargs))
+
+            res = async_to_sync(view)(request, **kwargs)
+
+            self.assertEqual(res.status_code, expected.status_code)
+            self.assertEqual(res['WWW-Authenticate'],
+                             expected['WWW-Authenticate'])
+            self.assertEqual(json.loads(res.content), expected.json())
+
+    def test_method_not_allowed(self):
+        """Test writes are refused once the request is authenticated"""
+        url = reverse('recipe-async:recipe-list')
+        request = self.factory.post(
+            url, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        res = async_to_sync(async_views.recipe_list)(request)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(res['Allow'], 'GET, OPTIONS')
+
+    def test_recipe_list_matches_sync_api(self):
+        """Test the async list returns the sync api payload"""
+        res = self._get(
+            async_views.recipe_list, reverse('recipe-async:recipe-list'))
+        expected = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(res.content), expected.json())
+
+    def test_recipe_detail_matches_sync_api(self):
+        """Test the async detail returns the sync api payload"""
+        url = reverse('recipe-async:recipe-detail', args=[self.recipe.id])
+
+        res = self._get(async_views.recipe_detail, url, pk=self.recipe.id)
+        expected = self.client.get(
+            reverse('recipe:recipe-detail', args=[self.recipe.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(res.content), expected.json())
+
+    def test_other_users_recipe_not_found(self):
+        """Test recipes of other users are not returned"""
+        other = create_user(email='other@example.com', username='other')
+        recipe = Recipe.objects.create(
+            user=other,
+            title='Hidden',
+            price=Decimal('1.00'),
+            time_minutes=1,
+        )
+        url = reverse('recipe-async:recipe-detail', args=[recipe.id])
+
+        res = self._get(async_views.recipe_detail, url, pk=recipe.id)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_list_and_detail(self):
+        """Test listing and retrieving tags"""
+        res = self._get(async_views.tag_list, reverse('recipe-async:tag-list'))
+        detail = self._get(
+            async_views.tag_detail,
+            reverse('recipe-async:tag-detail', args=[self.tag.id]),
+            pk=self.tag.id,
+        )
+
+        self.assertEqual(
+            [tag['name'] for tag in json.loads(res.content)['results']],
+            ['Vegan'],
+        )
+        self.assertEqual(json.loads(detail.content)['name'], 'Vegan')
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': True})
+    def test_cached_links_follow_path(self):
+        """Test lists cached by the sync api link to the async api"""
+        Tag.objects.create(user=self.user, name='Dessert')
+        self.client.get(reverse('recipe:tag-list'), {'page_size': 1})
+        url = reverse('recipe-async:tag-list')
+
+        res = self._get(async_views.tag_list, f'{url}?page_size=1')
+
+        self.assertTrue(
+            json.loads(res.content)['next'].startswith(
+                f'http://testserver{url}?'))
+
+    def test_cached_token_skips_database(self):
+        """Test a cached token is checked without leaving the event loop"""
+        url = reverse('recipe-async:tag-list')
+        self._get(async_views.tag_list, url)
+        request = self.factory.get(
+            url, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        with self.assertNumQueries(0):
+            user = async_to_sync(
+                async_views.authentication.authenticate_async)(request)
+
+        self.assertEqual(user, self.user)
+
+    def test_concurrent_requests_overlap(self):
+        """Test reads of concurrent requests run on separate threads"""
+        url = reverse('recipe-async:tag-list')
+
+        def slow_action(*args):
+            time.sleep(0.3)
+            return HttpResponse()
+
+        async def fetch_all():
+            requests = [
+                self.factory.get(
+                    url, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+                for _ in range(4)
+            ]
+            return await asyncio.gather(*(
+                async_views.tag_list(request) for request in requests))
+
+        # Caches the token, so only the reads leave the event loop
+        self._get(async_views.tag_list, url)
+        start = time.perf_counter()
+        with mock.patch.object(async_views, '_run_action', slow_action):
+            responses = async_to_sync(fetch_all)()
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([res.status_code for res in responses], [200] * 4)
+        self.assertLess(elapsed, 0.9)
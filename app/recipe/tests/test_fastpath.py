@@ -0,0 +1,131 @@
+"""
+Tests for the fast list path and renderer
+"""
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.renderers import FastJSONRenderer
+from recipe import serializers
+from recipe.fastpath import get_row_serializer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class FastListTests(TestCase):
+    """Test the fast list path renders the same bytes as the serializers"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            username='user',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        sweet = Tag.objects.create(user=self.user, name='Süß \u2028 "x"')
+        Tag.objects.create(user=self.user, name='Unused')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        for i, price in enumerate(['5.5', '12.25', '0.10', '999.99']):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Crème brûlée {i}\u2028\ttab',
+                price=Decimal(price),
+                time_minutes=i * 7,
+                link='' if i % 2 else f'https://example.com/{i}',
+            )
+            if i:
+                recipe.tags.add(sweet, vegan)
+            if i % 2:
+                recipe.ingredients.add(salt)
+
+    def _get(self, url, params=None, fast=True):
+        """Return the response content with the fast path on or off"""
+        with override_settings(
+            RECIPE_FAST_LIST={'ENABLED': fast},
+            RESPONSE_CACHE={'ENABLED': False},
+        ):
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, 200)
+        return res
+
+    def assertSameContent(self, url, params=None):
+        """Assert both paths return the same bytes, returning the fast one"""
+        fast = self._get(url, params)
+        self.assertEqual(fast.content, self._get(url, params, False).content)
+        return fast
+
+    def test_recipe_list_identical(self):
+        """Test recipe pages are byte-identical on both paths"""
+        first = self.assertSameContent(RECIPES_URL, {'page_size': 3})
+
+        self.assertEqual(len(first.data['results']), 3)
+        self.assertEqual(first.data['results'][0]['price'], '999.99')
+        self.assertEqual(
+            [tag['name'] for tag in first.data['results'][0]['tags']],
+            ['Vegan', 'Süß \u2028 "x"'],
+        )
+        self.assertIn(b'\\u2028', first.content)
+        self.assertSameContent(first.data['next'])
+
+    def test_filtered_and_searched_lists_identical(self):
+        """Test filters and the ranked search use the same output"""
+        tag = Tag.objects.get(name='Vegan')
+
+        self.assertSameContent(RECIPES_URL, {'tags': str(tag.id)})
+        self.assertSameContent(RECIPES_URL, {'search': 'vegan'})
+
+    def test_tag_and_ingredient_lists_identical(self):
+        """Test tag and ingredient pages with and without assigned_only"""
+        self.assertSameContent(TAGS_URL)
+        self.assertSameContent(TAGS_URL, {'assigned_only': 1})
+        res = self.assertSameContent(INGREDIENTS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.data['results'][0]['recipe_count'], 2)
+
+    def test_unsupported_serializer(self):
+        """Test serializers with computed fields keep the normal path"""
+        self.assertIsNone(
+            get_row_serializer(serializers.RecipeDetailSerializer))
+        self.assertIsNotNone(get_row_serializer(serializers.RecipeSerializer))
+
+
+class FastJSONRendererTests(TestCase):
+    """Test the orjson renderer matches JSONRenderer"""
+
+    def test_render_identical(self):
+        """Test the bytes are the same for the types the API returns"""
+        data = {
+            'text': 'naïve \u2028 \u2029 \x1f "q" \\ /',
+            'number': 12,
+            'none': None,
+            'flag': True,
+            'price': Decimal('5.50'),
+            'when': datetime.datetime(
+                2026, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2026, 1, 2),
+            'items': [{'id': 1, 'name': 'Vegan'}, ()],
+        }
+
+        for media_type in (None, 'application/json; indent=4'):
+            self.assertEqual(
+                FastJSONRenderer().render(data, media_type),
+                JSONRenderer().render(data, media_type),
+            )
+
+    def test_render_non_string_keys(self):
+        """Test payloads orjson rejects fall back to the json module"""
+        data = {1: 'one', None: 'none'}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data))
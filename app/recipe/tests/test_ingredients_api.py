@@ -60,7 +60,7 @@ class PrivateIngredientApiTests(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def test_ingredients_limited_user(self):
         """Test that ingredients for the authenticated user are returned"""
@@ -77,13 +77,13 @@ class PrivateIngredientApiTests(TestCase):
 
         res = self.client.get(INGREDIENT_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
         self.assertEqual(
-            res.data[0]['name'],
+            res.data['results'][0]['name'],
             ingredient.name,
         )
         self.assertEqual(
-            res.data[0]['id'],
+            res.data['results'][0]['id'],
             ingredient.id,
         )
 
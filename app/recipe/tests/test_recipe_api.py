@@ -2,11 +2,16 @@
 Test for recipe APIs.
 """
 from decimal import Decimal
+import csv
+import io
+import json
 import tempfile
 import os
 from PIL import Image
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -14,7 +19,9 @@ from core.models import (
     Recipe,
     Tag,
     Ingredient,
+    Job,
 )
+from recipe import exports, images
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
@@ -22,6 +29,8 @@ from recipe.serializers import (
 
 
 RECIPE_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 
 def detail_url(recipe_id):
@@ -83,7 +92,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test retrieving recipes for authenticated user"""
@@ -100,7 +109,63 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_list_recipes_constant_queries(self):
+        """Test listing recipes does not query per recipe"""
+        for i in range(5):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'Ing {i}'))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 5)
+        self.assertEqual(len(res.data['results'][0]['tags']), 1)
+        self.assertEqual(len(res.data['results'][0]['ingredients']), 1)
+
+    def test_get_recipe_detail_constant_queries(self):
+        """Test retrieving a recipe prefetches tags and ingredients"""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt'))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegan')
+        self.assertEqual(res.data['ingredients'][0]['name'], 'Salt')
+
+    def test_list_recipes_paginated(self):
+        """Test recipes are paginated with a cursor"""
+        recipes = [
+            create_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [recipes[4].id, recipes[3].id],
+        )
+        self.assertIsNone(res.data['previous'])
+
+        seen = [item['id'] for item in res.data['results']]
+        next_url = res.data['next']
+        while next_url:
+            res = self.client.get(next_url)
+            seen += [item['id'] for item in res.data['results']]
+            next_url = res.data['next']
+
+        self.assertEqual(seen, [r.id for r in reversed(recipes)])
 
     def test_get_recipe_detail(self):
         """Test retrieving recipe detail"""
@@ -179,6 +244,45 @@ class PrivateRecipeApiTests(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    def test_create_recipe_queries_independent_of_tags(self):
+        """Test creating nested tags and ingredients is batched"""
+        def create_with(count, prefix):
+            payload = {
+                'title': f'{prefix} recipe',
+                'price': Decimal('5.99'),
+                'time_minutes': 30,
+                'tags': [{'name': f'{prefix} tag {i}'} for i in range(count)],
+                'ingredients': [
+                    {'name': f'{prefix} ingredient {i}'} for i in range(count)
+                ],
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECIPE_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(ctx.captured_queries)
+
+        Tag.objects.create(user=self.user, name='large tag 0')
+        self.assertEqual(create_with(2, 'small'), create_with(30, 'large'))
+        recipe = Recipe.objects.get(title='large recipe')
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 32)
+
+    def test_create_recipe_duplicate_tag_names(self):
+        """Test repeated tag names in a payload create a single tag"""
+        payload = {
+            'title': 'Sample recipe',
+            'price': Decimal('5.99'),
+            'time_minutes': 30,
+            'tags': [{'name': 'Vegan'}, {'name': 'Vegan'}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_create_tag_updating_recipe(self):
         """Creating new tags on Updating  the Recipe"""
         recipe = create_recipe(user=self.user)
@@ -215,6 +319,27 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(tag_lucent, recipe.tags.all())
         self.assertNotIn(tag_breakfast, recipe.tags.all())
 
+    def test_update_recipe_tags_writes_only_delta(self):
+        """Test updating tags keeps links for unchanged tags"""
+        tag_keep = Tag.objects.create(user=self.user, name='Keep')
+        tag_drop = Tag.objects.create(user=self.user, name='Drop')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag_keep, tag_drop)
+        through = Recipe.tags.through
+        kept_link = through.objects.get(recipe=recipe, tag=tag_keep)
+
+        payload = {'tags': [{'name': 'Keep'}, {'name': 'New'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(tag['name'] for tag in res.data['tags']),
+            ['Keep', 'New'],
+        )
+        self.assertTrue(through.objects.filter(id=kept_link.id).exists())
+        self.assertFalse(recipe.tags.filter(id=tag_drop.id).exists())
+        self.assertEqual(recipe.tags.count(), 2)
+
     def test_clear_recipe_tags(self):
         """Clearing Recipe Tags"""
         tag = Tag.objects.create(user=self.user, name='Breakfast')
@@ -368,9 +493,9 @@ class PrivateRecipeApiTests(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         """Test Filtering by ingredients"""
@@ -394,9 +519,219 @@ class PrivateRecipeApiTests(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_filter_by_tags_no_duplicates(self):
+        """Test a recipe matching several tags is returned once"""
+        recipe = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [recipe.id])
+
+    def test_filter_by_all_tags(self):
+        """Test match=all only returns recipes having every tag"""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        both = create_recipe(user=self.user, title='Vegan cake')
+        both.tags.add(tag1, tag2)
+        one = create_recipe(user=self.user, title='Vegan curry')
+        one.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'})
+
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [both.id])
+
+    def test_search_recipes(self):
+        """Test full-text search across titles, tags and ingredients"""
+        r1 = create_recipe(user=self.user, title='Thai green curry')
+        r2 = create_recipe(user=self.user, title='Pasta bake')
+        r2.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Curry powder'))
+        r3 = create_recipe(user=self.user, title='Fish and chips')
+
+        res = self.client.get(RECIPE_URL, {'search': 'curry'})
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(ids, [r1.id, r2.id])
+        self.assertNotIn(r3.id, ids)
+
+    def test_search_follows_tag_rename(self):
+        """Test renaming a tag updates search results"""
+        recipe = create_recipe(user=self.user, title='Salad')
+        tag = Tag.objects.create(user=self.user, name='Summer')
+        recipe.tags.add(tag)
+        tag.name = 'Winter'
+        tag.save()
+
+        summer = self.client.get(RECIPE_URL, {'search': 'summer'})
+        winter = self.client.get(RECIPE_URL, {'search': 'winter'})
+
+        self.assertEqual(summer.data['results'], [])
+        self.assertEqual(winter.data['results'][0]['id'], recipe.id)
+
+    def test_search_paginated_by_rank(self):
+        """Test paging through search results keeps relevance order"""
+        best = create_recipe(user=self.user, title='Soup soup soup')
+        good = create_recipe(user=self.user, title='Tomato soup')
+        other = create_recipe(
+            user=self.user, title='Salad', description='Not a soup')
+
+        res = self.client.get(RECIPE_URL, {'search': 'soup', 'page_size': 2})
+        ids = [item['id'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [item['id'] for item in res.data['results']]
+
+        self.assertEqual(ids, [best.id, good.id, other.id])
+
+    def test_search_paginated_equal_rank(self):
+        """Test paging through equally relevant results by id"""
+        recipes = [
+            create_recipe(user=self.user, title='Pea soup') for _ in range(3)
+        ]
+
+        ids = []
+        url, params = RECIPE_URL, {'search': 'soup', 'page_size': 1}
+        while url:
+            res = self.client.get(url, params)
+            ids += [item['id'] for item in res.data['results']]
+            url, params = res.data['next'], None
+
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+
+    def test_bulk_create_update_delete(self):
+        """Test applying a batch of recipe changes"""
+        to_update = create_recipe(user=self.user, title='Old title')
+        to_update.tags.add(Tag.objects.create(user=self.user, name='Old'))
+        to_delete = create_recipe(user=self.user)
+        payload = {
+            'create': [
+                {
+                    'title': 'Curry',
+                    'price': Decimal('4.50'),
+                    'time_minutes': 20,
+                    'tags': [{'name': 'Thai'}],
+                    'ingredients': [{'name': 'Rice'}],
+                },
+                {
+                    'title': 'Soup',
+                    'price': Decimal('2.00'),
+                    'time_minutes': 10,
+                    'tags': [{'name': 'Thai'}],
+                },
+            ],
+            'update': [
+                {'id': to_update.id, 'title': 'New title',
+                 'tags': [{'name': 'Thai'}]},
+            ],
+            'delete': [to_delete.id],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['create']), 2)
+        self.assertEqual(res.data['delete'], [to_delete.id])
+        self.assertFalse(Recipe.objects.filter(id=to_delete.id).exists())
+        to_update.refresh_from_db()
+        self.assertEqual(to_update.title, 'New title')
+        self.assertEqual(res.data['update'][0]['title'], 'New title')
+        self.assertEqual(
+            [tag.name for tag in to_update.tags.all()], ['Thai'])
+        self.assertEqual(Tag.objects.filter(name='Thai').count(), 1)
+        curry = Recipe.objects.get(id=res.data['create'][0]['id'])
+        self.assertEqual(curry.user, self.user)
+        self.assertEqual(curry.ingredients.get().name, 'Rice')
+
+    def test_bulk_invalid_item_applies_nothing(self):
+        """Test an invalid batch item reports errors and rolls back"""
+        user2 = get_user_model().objects.create_user(
+            email='user2@example.com',
+            username='user2',
+            password='password123',
+        )
+        other = create_recipe(user=user2)
+        payload = {
+            'create': [
+                {'title': 'Curry', 'price': Decimal('4.50'),
+                 'time_minutes': 20},
+            ],
+            'delete': [other.id],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data['delete'][0])
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_export_ndjson(self):
+        """Test streaming recipes as newline delimited JSON"""
+        r1 = create_recipe(user=self.user, title='First')
+        r1.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        r2 = create_recipe(user=self.user, title='Second')
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['id'] for row in rows], [r2.id, r1.id])
+        self.assertEqual(rows[1]['tags'][0]['name'], 'Vegan')
+        self.assertEqual(rows[1]['description'], r1.description)
+
+    def test_export_csv(self):
+        """Test streaming recipes as CSV"""
+        recipe = create_recipe(user=self.user)
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt'),
+            Ingredient.objects.create(user=self.user, name='Rice'),
+        )
+
+        res = self.client.get(EXPORT_URL, {'output': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], recipe.title)
+        self.assertEqual(
+            sorted(rows[0]['ingredients'].split('|')), ['Rice', 'Salt'])
+
+    def test_export_unknown_format(self):
+        """Test requesting an unsupported export format fails"""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_chunks_prefetch_per_chunk(self):
+        """Test export queries scale with chunks, not recipes"""
+        for i in range(5):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {i}'))
+        queryset = Recipe.objects.filter(user=self.user).order_by('-id')
+
+        with self.assertNumQueries(7):
+            chunks = list(exports.iter_chunks(
+                queryset, ['tags', 'ingredients'], chunk_size=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        with self.assertNumQueries(0):
+            for chunk in chunks:
+                for recipe in chunk:
+                    list(recipe.tags.all())
 
 
 class ImageUploadTestCase(TestCase):
@@ -413,8 +748,24 @@ class ImageUploadTestCase(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        images.delete_variants(
+            self.recipe.image.storage, self.recipe.image_variants)
         self.recipe.image.delete()
 
+    def _upload(self, size=(10, 10)):
+        """Upload a generated JPEG image to the recipe"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as img_file:
+            image = Image.new('RGB', size)
+            image.save(img_file, format='JPEG')
+            img_file.seek(0)
+            return self.client.post(
+                url,
+                {'image': img_file},
+                format='multipart',
+            )
+
     def test_upload_image(self):
         """Test for Uploading the file"""
         url = image_upload_url(self.recipe.id)
@@ -440,3 +791,74 @@ class ImageUploadTestCase(TestCase):
         res = self.client.post(url, payload, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_queues_variants_job(self):
+        """Test the variants are generated by a background job"""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, {})
+        job = Job.objects.get(user=self.user)
+        self.assertEqual(job.task, 'recipe.images.generate_variants')
+        self.assertEqual(job.payload, {
+            'recipe_id': self.recipe.id,
+            'image_name': self.recipe.image.name,
+        })
+
+    @override_settings(RECIPE_IMAGE_VARIANTS={
+        'SIZES': {'thumbnail': 40, 'small': 80},
+        'ASYNC': False,
+    })
+    def test_upload_generates_variants(self):
+        """Test every size is rendered and exposed on the detail"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload(size=(200, 100))
+        self.recipe.refresh_from_db()
+
+        self.assertEqual(
+            set(self.recipe.image_variants), {'thumbnail', 'small'})
+        storage = self.recipe.image.storage
+        for size, max_size in (('thumbnail', 40), ('small', 80)):
+            formats = self.recipe.image_variants[size]
+            self.assertIn('jpeg', formats)
+            for path in formats.values():
+                with Image.open(storage.path(path)) as image:
+                    self.assertEqual(image.size, (max_size, max_size // 2))
+
+        res = self.client.get(detail_url(self.recipe.id))
+        variants = res.data['image_variants']
+        self.assertTrue(
+            variants['thumbnail']['jpeg'].startswith('http://testserver/'))
+        self.assertTrue(variants['small']['jpeg'].endswith('_small.jpg'))
+
+    @override_settings(RECIPE_IMAGE_VARIANTS={'ASYNC': False})
+    def test_reupload_replaces_variants(self):
+        """Test uploading a new image removes the old variant files"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload()
+        self.recipe.refresh_from_db()
+        old = self.recipe.image_variants['thumbnail']['jpeg']
+        old_image = self.recipe.image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload()
+        self.recipe.refresh_from_db()
+
+        storage = self.recipe.image.storage
+        self.assertFalse(storage.exists(old))
+        self.assertNotEqual(
+            self.recipe.image_variants['thumbnail']['jpeg'], old)
+        storage.delete(old_image)
+
+    def test_stale_variants_are_discarded(self):
+        """Test variants of a replaced image are not recorded"""
+        self._upload()
+        self.recipe.refresh_from_db()
+
+        result = images.generate_variants(self.recipe.id, 'uploads/old.jpg')
+
+        self.assertIsNone(result)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, {})
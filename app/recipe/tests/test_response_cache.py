@@ -0,0 +1,218 @@
+"""
+Test for the recipe api response cache
+"""
+import gzip
+import json
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import compression
+from core.models import Recipe, Tag
+from recipe.cache import response_cache
+from recipe.checks import check_response_cache
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_recipe(user, **params):
+    """Create and return sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'price': Decimal('5.00'),
+        'time_minutes': 10,
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': True})
+class ResponseCacheTests(TestCase):
+    """Test caching of list responses"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            username='user',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list is served without queries"""
+        create_recipe(user=self.user)
+        first = self.client.get(RECIPE_URL)
+        hits = response_cache.stats()['hits']
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(response_cache.stats()['hits'], hits + 1)
+
+    def test_filter_params_normalized(self):
+        """Test filters in a different order share a cache entry"""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        with self.assertNumQueries(0):
+            self.client.get(RECIPE_URL, {'tags': f'{tag2.id},{tag1.id}'})
+
+    def test_create_invalidates(self):
+        """Test creating a recipe through the api expires the list"""
+        self.client.get(RECIPE_URL)
+        payload = {
+            'title': 'Curry',
+            'price': Decimal('4.50'),
+            'time_minutes': 20,
+            'tags': [{'name': 'Thai'}],
+        }
+        self.client.post(RECIPE_URL, payload, format='json')
+
+        recipes = self.client.get(RECIPE_URL)
+        tags = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(recipes.data['results']), 1)
+        self.assertEqual(tags.data['results'][0]['name'], 'Thai')
+
+    def test_delete_invalidates(self):
+        """Test deleting a tag through the api expires the list"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        self.client.delete(reverse('recipe:tag-detail', args=[tag.id]))
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_cache_per_user(self):
+        """Test users never see each other's cached lists"""
+        create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+        user2 = get_user_model().objects.create_user(
+            email='user2@example.com',
+            username='user2',
+            password='testpass123',
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_evicted_generation_not_reused(self):
+        """Test a lost generation counter does not revive old entries"""
+        create_recipe(user=self.user, title='Old')
+        self.client.get(RECIPE_URL)
+        generation = response_cache.generation(self.user.id)
+        cache.delete(f'recipe:gen:{self.user.id}')
+        Recipe.objects.update(title='New')
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertNotEqual(
+            response_cache.generation(self.user.id), generation)
+        self.assertEqual(res.data['results'][0]['title'], 'New')
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'other.example.com'])
+    def test_cache_per_url(self):
+        """Test cached next links belong to the host of the request"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Dessert')
+        self.client.get(TAGS_URL, {'page_size': 1})
+
+        res = self.client.get(
+            TAGS_URL, {'page_size': 1}, HTTP_HOST='other.example.com')
+
+        self.assertTrue(res.data['next'].startswith(
+            f'http://other.example.com{TAGS_URL}?'))
+
+    def test_compressed_body_cached(self):
+        """Test repeated compressed hits reuse the stored gzip bytes"""
+        for i in range(20):
+            create_recipe(user=self.user, title=f'Compressible recipe {i}')
+        plain = self.client.get(RECIPE_URL)
+        first = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        with self.assertNumQueries(0), mock.patch.object(
+            compression, 'compress', wraps=compression.compress,
+        ) as compress:
+            second = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        compress.assert_not_called()
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', second['Vary'])
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(gzip.decompress(second.content), plain.content)
+
+    def test_hit_and_miss_headers_identical(self):
+        """Test cached responses carry the headers of computed ones"""
+        for i in range(20):
+            create_recipe(user=self.user, title=f'Compressible recipe {i}')
+
+        for accept_encoding in ('gzip', ''):
+            cache.clear()
+            miss = self.client.get(
+                RECIPE_URL, HTTP_ACCEPT_ENCODING=accept_encoding)
+            with self.assertNumQueries(0):
+                hit = self.client.get(
+                    RECIPE_URL, HTTP_ACCEPT_ENCODING=accept_encoding)
+
+            self.assertEqual(dict(hit.items()), dict(miss.items()))
+            self.assertEqual(
+                hit['Vary'], 'Accept, Accept-Encoding, Authorization')
+
+    def test_compressed_body_invalidated(self):
+        """Test writes expire the stored compressed bytes too"""
+        for i in range(20):
+            create_recipe(user=self.user, title=f'Compressible recipe {i}')
+        self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.client.post(RECIPE_URL, {
+            'title': 'Posted',
+            'time_minutes': 5,
+            'price': '1.00',
+        }, format='json')
+
+        res = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        results = json.loads(gzip.decompress(res.content))['results']
+        self.assertEqual(len(results), 21)
+        self.assertEqual(results[0]['title'], 'Posted')
+
+
+class ResponseCacheCheckTests(SimpleTestCase):
+    """Test the system check of the response cache backend"""
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': True})
+    def test_locmem_rejected(self):
+        """Test enabling the cache on a per-process backend is an error"""
+        errors = check_response_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['recipe.E001'])
+
+    @override_settings(
+        RESPONSE_CACHE={'ENABLED': True},
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_table',
+        }},
+    )
+    def test_shared_backend_accepted(self):
+        """Test a shared backend passes the check"""
+        self.assertEqual(check_response_cache(None), [])
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': False})
+    def test_disabled_accepted(self):
+        """Test a disabled cache passes on any backend"""
+        self.assertEqual(check_response_cache(None), [])
@@ -0,0 +1,150 @@
+"""
+Tests for the fields and exclude query params
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class SparseFieldsTests(TestCase):
+    """Test sparse fieldsets of the recipe, tag and ingredient endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            username='user',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                description='Long description',
+                price=Decimal('5.50'),
+                time_minutes=10,
+            )
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+    def test_recipe_list_fields(self):
+        """Test fields=id,title renders those keys from a single query"""
+        for fast in (True, False):
+            with override_settings(RECIPE_FAST_LIST={'ENABLED': fast}):
+                with self.assertNumQueries(1):
+                    res = self.client.get(RECIPES_URL, {'fields': 'title,id'})
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data['results']), 3)
+            for item in res.data['results']:
+                self.assertEqual(list(item), ['id', 'title'])
+
+    def test_recipe_list_exclude(self):
+        """Test excluded nested lists are not loaded"""
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPES_URL, {'exclude': 'tags'})
+
+        self.assertEqual(
+            list(res.data['results'][0]),
+            ['id', 'title', 'price', 'time_minutes', 'link', 'ingredients'],
+        )
+        self.assertEqual(res.data['results'][0]['ingredients'][0]['name'],
+                         'Salt')
+
+    def test_fast_and_normal_paths_identical(self):
+        """Test both list paths return the same bytes for sparse fields"""
+        params = {'fields': 'price,tags', 'page_size': 2}
+        contents = []
+        for fast in (True, False):
+            with override_settings(RECIPE_FAST_LIST={'ENABLED': fast}):
+                res = self.client.get(RECIPES_URL, params)
+                contents.append(
+                    (res.content, self.client.get(res.data['next']).content))
+
+        self.assertEqual(contents[0], contents[1])
+
+    def test_recipe_retrieve_fields(self):
+        """Test the detail view renders the requested fields"""
+        recipe = Recipe.objects.first()
+
+        res = self.client.get(
+            detail_url(recipe.id), {'fields': 'description,image_variants'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'description': 'Long description',
+            'image_variants': {},
+        })
+
+    def test_unknown_field(self):
+        """Test unknown field names are a bad request"""
+        res = self.client.get(
+            RECIPES_URL, {'fields': 'id,secret', 'exclude': 'nope'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'fields', 'exclude'})
+
+    def test_writes_unaffected(self):
+        """Test the params do not trim the fields of writes"""
+        recipe = Recipe.objects.first()
+
+        res = self.client.patch(
+            f'{detail_url(recipe.id)}?fields=id',
+            {'title': 'New title'},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'New title')
+        self.assertIn('tags', res.data)
+
+    def test_tag_and_ingredient_fields(self):
+        """Test tag pages without the name still paginate by name"""
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.get(TAGS_URL, {'fields': 'id', 'page_size': 1})
+        following = self.client.get(res.data['next'])
+        ingredients = self.client.get(
+            INGREDIENTS_URL, {'exclude': 'name'})
+
+        self.assertEqual(list(res.data['results'][0]), ['id'])
+        self.assertNotEqual(
+            res.data['results'][0]['id'], following.data['results'][0]['id'])
+        self.assertEqual(
+            ingredients.data['results'], [
+                {'id': Ingredient.objects.get().id, 'recipe_count': 3},
+            ])
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': True})
+    def test_cached_per_fieldset(self):
+        """Test fieldsets are cached apart, in any order of the names"""
+        cache.clear()
+        full = self.client.get(RECIPES_URL)
+        sparse = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        with self.assertNumQueries(0):
+            again = self.client.get(RECIPES_URL, {'fields': 'title,id,id'})
+
+        self.assertIn('tags', full.data['results'][0])
+        self.assertEqual(again.data, sparse.data)
@@ -1,6 +1,8 @@
 """
 Test for the Tags API
 """
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
@@ -8,7 +10,7 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tag
+from core.models import Recipe, Tag
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
@@ -61,7 +63,7 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
@@ -74,9 +76,82 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], tag.name)
-        self.assertEqual(res.data[0]["id"], tag.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]["name"], tag.name)
+        self.assertEqual(res.data['results'][0]["id"], tag.id)
+
+    def test_tags_paginated(self):
+        """Test tags are paginated by name with a cursor"""
+        for name in ['Apple', 'Banana', 'Cherry']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Cherry', 'Banana'],
+        )
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Apple'],
+        )
+        self.assertIsNone(res.data['next'])
+
+    def test_filter_tags_assigned_only(self):
+        """Test listing only tags assigned to recipes"""
+        tag1 = Tag.objects.create(user=self.user, name="Breakfast")
+        Tag.objects.create(user=self.user, name="Lunch")
+        recipe = Recipe.objects.create(
+            title="Eggs",
+            time_minutes=10,
+            price=Decimal("5.00"),
+            user=self.user,
+        )
+        recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {"assigned_only": 1})
+        tag1.refresh_from_db()
+
+        self.assertEqual(res.data['results'], [TagSerializer(tag1).data])
+
+    def test_filter_tags_assigned_unique(self):
+        """Test assigned tags are listed once with their recipe count"""
+        tag = Tag.objects.create(user=self.user, name="Breakfast")
+        Tag.objects.create(user=self.user, name="Dinner")
+        for title in ["Pancakes", "Porridge"]:
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=Decimal("3.00"),
+                user=self.user,
+            )
+            recipe.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]["recipe_count"], 2)
+
+    def test_recipe_count_maintained(self):
+        """Test the recipe count follows links and survives tag saves"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        recipe = Recipe.objects.create(
+            title="Salad",
+            time_minutes=5,
+            price=Decimal("3.00"),
+            user=self.user,
+        )
+        recipe.tags.add(tag)
+        tag.name = "Plant based"
+        tag.save()
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+
+        recipe.delete()
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 0)
 
     def test_update_tag_successful(self):
         """Test updating a tag with patch"""
@@ -90,6 +165,15 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(tag.name, payload["name"])
 
+    def test_create_duplicate_tag_rejected(self):
+        """Test creating a tag with an existing name returns an error"""
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.post(TAGS_URL, {"name": "Vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_delete_tag(self):
         """Test for deleting a tag"""
         tag = Tag.objects.create(user=self.user, name="Breakfast")
@@ -12,16 +12,63 @@ from drf_spectacular.utils import (
     OpenApiParameter,
     OpenApiTypes,
 )
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import (
+    BigIntegerField,
+    Count,
+    Exists,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Prefetch,
+)
+from django.db.models.functions import Cast, Round
+from django.http import StreamingHttpResponse
+from core.authentication import CachedTokenAuthentication
+from core.renderers import FastJSONRenderer
 from core.models import (
     Recipe,
     Tag,
     Ingredient,
 )
-from recipe import serializers
+from recipe import serializers, exports, images
+from recipe.cache import CachedListMixin
+from recipe.fastpath import FastListMixin
+from recipe.sparse import SparseFieldsMixin
+from recipe.pagination import (
+    RecipeCursorPagination,
+    RecipeAttrCursorPagination,
+)
+
+
+# Search results are paged on an exact integer, not the float rank: the
+# rank to six places shifted above the id, which breaks ties
+SEARCH_RANK_SCALE = 10 ** 6
+SEARCH_ID_SPAN = 2 ** 31
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of the fields to return',
+    ),
+    OpenApiParameter(
+        'exclude',
+        OpenApiTypes.STR,
+        description='Comma separated list of the fields to leave out',
+    ),
+]
 
 
 @extend_schema_view(
@@ -36,36 +83,150 @@ from recipe import serializers
                 'ingredients',
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredient ids to filter',
-            )
+            ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR,
+                enum=['any', 'all'],
+                description='Whether recipes must have any (default) or all '
+                            'of the tags and ingredients',
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Full-text search of titles, descriptions, '
+                            'tags and ingredients, ordered by relevance',
+            ),
+            *SPARSE_FIELDS_PARAMETERS,
         ]
-    )
+    ),
+    retrieve=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedListMixin,
+                    SparseFieldsMixin,
+                    FastListMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-    queryset = Recipe.objects.all()
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    pagination_class = RecipeCursorPagination
+    cache_params = (
+        'tags', 'ingredients', 'match', 'search', 'fields', 'exclude',
+    )
+    # Columns read by fields beyond their own
+    field_columns = {'image_variants': ('image_variants', 'image')}
+    queryset = Recipe.objects.defer('search_vector')
     serializer_class = serializers.RecipeDetailSerializer
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to integer"""
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _get_columns(self, serializer_class, fields=None):
+        """Return the recipe columns rendered by the serializer"""
+        concrete = {
+            field.name for field in Recipe._meta.concrete_fields
+        }
+        if fields is None:
+            fields = serializer_class.Meta.fields
+        columns = ['id']
+        for name in fields:
+            columns.extend(self.field_columns.get(name, (name,)))
+        return [
+            name for name in dict.fromkeys(columns) if name in concrete
+        ]
+
+    def _get_prefetches(self, fields=None):
+        """Return prefetches loading only the rendered related columns"""
+        # Ordered like the nested lists of the fast list path
+        prefetches = {
+            'tags': Prefetch(
+                'tags',
+                queryset=Tag.objects.only(
+                    *serializers.TagSerializer.Meta.fields).order_by('id'),
+            ),
+            'ingredients': Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only(
+                    *serializers.IngredientSerializer.Meta.fields,
+                ).order_by('id'),
+            ),
+        }
+        return [
+            prefetch for name, prefetch in prefetches.items()
+            if fields is None or name in fields
+        ]
+
+    def _optimize_queryset(self, queryset):
+        """Prefetch related objects and trim columns for read actions"""
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        fields = self.get_sparse_fields()
+        queryset = queryset.prefetch_related(*self._get_prefetches(fields))
+        return queryset.only(
+            *self._get_columns(self.get_serializer_class(), fields))
+
     def get_queryset(self):
         """Return recipes for the authenticated user"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
+        match_all = self.request.query_params.get('match') == 'all'
+        queryset = self._optimize_queryset(self.queryset)
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = self._filter_linked(
+                queryset, Recipe.tags.through, 'tag_id', tag_ids, match_all)
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = self._filter_linked(
+                queryset,
+                Recipe.ingredients.through,
+                'ingredient_id',
+                ingredient_ids,
+                match_all,
+            )
+        search = self._get_search_query()
+        if search is not None:
+            queryset = queryset.filter(search_vector=search).annotate(
+                rank=SearchRank(F('search_vector'), search),
+            ).annotate(
+                search_position=ExpressionWrapper(
+                    Cast(
+                        Round(F('rank') * SEARCH_RANK_SCALE),
+                        BigIntegerField(),
+                    ) * SEARCH_ID_SPAN + F('id'),
+                    output_field=BigIntegerField(),
+                ),
+            )
         return queryset.filter(
             user=self.request.user
-        ).order_by('-id').distinct()
-        # return self.queryset.filter(user=self.request.user).order_by('-id')
+        ).order_by(*self.get_cursor_ordering())
+
+    def _filter_linked(self, queryset, through, column, ids, match_all):
+        """Filter recipes linked to any/all ids without joining the links"""
+        links = through.objects.filter(**{f'{column}__in': ids})
+        if match_all:
+            matching = links.values('recipe_id').annotate(
+                matched=Count(column),
+            ).filter(matched=len(set(ids))).values('recipe_id')
+            return queryset.filter(id__in=matching)
+        return queryset.filter(
+            Exists(links.filter(recipe_id=OuterRef('pk')))
+        )
+
+    def _get_search_query(self):
+        """Return the full-text query for the search param, if any"""
+        search = self.request.query_params.get('search', '').strip()
+        if not search:
+            return None
+        return SearchQuery(search, config='english', search_type='websearch')
+
+    def get_cursor_ordering(self):
+        """Order searches by relevance and everything else newest first"""
+        if self.request.query_params.get('search', '').strip():
+            return ('-search_position',)
+        return ('-id',)
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -73,11 +234,26 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'bulk':
+            return serializers.RecipeBulkSerializer
+        elif self.action == 'export':
+            return serializers.RecipeDetailSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
+        self.invalidate_cache()
+
+    def perform_update(self, serializer):
+        """Update a recipe"""
+        serializer.save()
+        self.invalidate_cache()
+
+    def perform_destroy(self, instance):
+        """Delete a recipe"""
+        instance.delete()
+        self.invalidate_cache()
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
@@ -87,8 +263,27 @@ class RecipeViewSet(viewsets.ModelViewSet):
             recipe,
             data=request.data,
         )
+        if serializer.is_valid():
+            with transaction.atomic():
+                serializer.save()
+                images.replace_variants(recipe)
+            self.invalidate_cache()
+            return Response(
+                serializer.data,
+                status=status.HTTP_200_OK,
+            )
+        return Response(
+            serializer.errors,
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create, update and delete recipes in a single transaction"""
+        serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
+            self.invalidate_cache()
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK,
@@ -98,6 +293,44 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'output',
+                OpenApiTypes.STR,
+                enum=['ndjson', 'csv'],
+                description='Export file format, defaults to ndjson',
+            ),
+        ]
+    )
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """Stream all recipes of the authenticated user"""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {'output': [f'Unsupported export format "{output}".']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        chunks = exports.iter_chunks(
+            self.get_queryset(), self._get_prefetches())
+        if output == 'csv':
+            lines = exports.csv_lines(chunks)
+        else:
+            lines = exports.ndjson_lines(
+                chunks,
+                self.get_serializer_class(),
+                self.get_serializer_context(),
+            )
+        response = StreamingHttpResponse(
+            lines,
+            content_type=EXPORT_CONTENT_TYPES[output],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{output}"'
+        )
+        return response
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -108,17 +341,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 enum=[0, 1],
                 description='Filter by items assigned to recipe',
             ),
+            *SPARSE_FIELDS_PARAMETERS,
         ]
     )
 )
-class BaseRecipeAttrViewSet(mixins.UpdateModelMixin,
+class BaseRecipeAttrViewSet(CachedListMixin,
+                            SparseFieldsMixin,
+                            FastListMixin,
+                            mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin,
                             mixins.DestroyModelMixin,
                             viewsets.GenericViewSet):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    pagination_class = RecipeAttrCursorPagination
+    cache_params = ('assigned_only', 'fields', 'exclude')
 
     def get_queryset(self):
         """Return objects for the authenticated user only"""
@@ -127,15 +367,40 @@ class BaseRecipeAttrViewSet(mixins.UpdateModelMixin,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(recipe_count__gt=0)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            # The name is the cursor position of the pagination
+            queryset = queryset.only('id', 'name', *fields)
 
         return queryset.filter(
             user=self.request.user
         ).order_by('-name')
 
+    def _save_unique(self, serializer, **kwargs):
+        """Save the object, reporting a duplicate name as a bad request"""
+        try:
+            with transaction.atomic():
+                serializer.save(**kwargs)
+        except IntegrityError:
+            raise ValidationError(
+                {'name': ['An item with this name already exists.']}
+            )
+
     def perform_create(self, serializer):
         """Create a new object"""
-        serializer.save(user=self.request.user)
+        self._save_unique(serializer, user=self.request.user)
+        self.invalidate_cache()
+
+    def perform_update(self, serializer):
+        """Update an existing object"""
+        self._save_unique(serializer)
+        self.invalidate_cache()
+
+    def perform_destroy(self, instance):
+        """Delete an object"""
+        instance.delete()
+        self.invalidate_cache()
 
 
 class TagViewSet(BaseRecipeAttrViewSet):